@@ -0,0 +1,29 @@
+import gc
+import tracemalloc
+from sys import argv
+from niftiview.core import TEMPLATES, ATLASES
+
+from niftiview_app.grid import ImageGrid
+
+
+def measure(filepath, native):
+    gc.collect()
+    tracemalloc.start()
+    niigrid = ImageGrid([filepath], pyramid=False, native=native)
+    resident, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del niigrid
+    return resident, peak
+
+
+def main(filepaths):
+    print(f'{"file":<48} {"float32 [MB]":>16} {"native [MB]":>16} {"ratio":>6}')
+    for filepath in filepaths:
+        (resident, peak), (native_resident, native_peak) = measure(filepath, False), measure(filepath, True)
+        print(f'{filepath[-48:]:<48} {resident / 2 ** 20:>7.1f} ({peak / 2 ** 20:>6.1f}) '
+              f'{native_resident / 2 ** 20:>7.1f} ({native_peak / 2 ** 20:>6.1f}) {resident / native_resident:>6.2f}')
+    print('Resident memory per volume after loading (peak during loading in brackets)')
+
+
+if __name__ == '__main__':
+    main(argv[1:] or list(TEMPLATES.values()) + list(ATLASES.values()))
@@ -0,0 +1,40 @@
+from sys import argv
+from time import perf_counter
+from niftiview.core import TEMPLATES, ATLASES
+
+from niftiview_app.grid import ImageGrid
+from niftiview_app.utils import TMP_HEIGHTS
+from niftiview_app.resample import get_core_images
+N_REPEATS = 10
+
+
+def time_pil(nics, height, resize_modes):
+    start = perf_counter()
+    for _ in range(N_REPEATS):
+        for nic, resize_mode in zip(nics, resize_modes):
+            nic.get_image((0, 0, 0), 'all', height, None, None, resize_mode)
+    return (perf_counter() - start) / N_REPEATS
+
+
+def time_cached(nics, height, resize_modes):
+    start = perf_counter()
+    for _ in range(N_REPEATS):
+        get_core_images(nics, len(nics) * [(0, 0, 0)], 'all', height, None, None, resize_modes)
+    return (perf_counter() - start) / N_REPEATS
+
+
+def main(filepaths):
+    nics = ImageGrid([filepaths], pyramid=False).niis[0].nics
+    print(f'{len(nics)} layer(s) of shape {nics[0].shape[:3]}, layout "all"')
+    print(f'{"height":>6} {"filter":>8} {"PIL [ms]":>10} {"cached [ms]":>12} {"speedup":>8}')
+    for height in TMP_HEIGHTS:
+        for name, resize_mode in [('lanczos', 1), ('bicubic', 3), ('nearest', 0)]:
+            resize_modes = len(nics) * [resize_mode]
+            time_cached(nics, height, resize_modes)
+            pil_time, cached_time = time_pil(nics, height, resize_modes), time_cached(nics, height, resize_modes)
+            print(f'{height:>6} {name:>8} {1000 * pil_time:>10.1f} {1000 * cached_time:>12.1f} '
+                  f'{pil_time / cached_time:>8.2f}')
+
+
+if __name__ == '__main__':
+    main(argv[1:] or [list(TEMPLATES.values())[0], list(ATLASES.values())[0]])
@@ -0,0 +1,56 @@
+import re
+import numpy as np
+from pathlib import Path
+LABEL_EXTENSIONS = ('.tsv', '.csv', '.txt', '.lut')
+LABEL_PATTERN = re.compile(r'^\s*(\d+)[\s,;:]+"?([^"\t,;]+?)"?\s*(?:[\t,;].*)?$')
+
+
+class Atlas:
+    def __init__(self, array, names=None):
+        self.labels, self.codes = get_label_codes(np.rint(array).astype(np.int64))
+        self.names = {} if names is None else names
+
+    def __len__(self):
+        return len(self.labels)
+
+    def label_at(self, idx):
+        return self.labels[self.codes[tuple(idx[:3])]].item()
+
+    def name_at(self, idx):
+        label = self.label_at(idx)
+        return self.names.get(label, f'Label {label}') if label else None
+
+
+def get_label_codes(labels, max_dense=2 ** 24):
+    offset = labels.min()
+    if labels.max() - offset < max_dense:
+        is_present = np.bincount((labels - offset).ravel()) > 0
+        table = np.cumsum(is_present) - 1
+        unique_labels = np.flatnonzero(is_present) + offset
+        codes = table.astype(np.uint16 if len(unique_labels) <= 2 ** 16 else np.uint32)[labels - offset]
+    else:
+        unique_labels, codes = np.unique(labels, return_inverse=True)
+        codes = codes.reshape(labels.shape).astype(np.uint16 if len(unique_labels) <= 2 ** 16 else np.uint32)
+    return unique_labels, codes
+
+
+def load_label_names(filepath):
+    if filepath is None:
+        return {}
+    stem = str(Path(filepath).name).split('.')[0]
+    for ext in LABEL_EXTENSIONS:
+        label_filepath = Path(filepath).parent / f'{stem}{ext}'
+        if label_filepath.is_file():
+            names = parse_label_names(label_filepath.read_text(errors='ignore'))
+            if names:
+                return names
+    return {}
+
+
+def parse_label_names(text):
+    names = {}
+    for line in text.splitlines():
+        match = LABEL_PATTERN.match(line)
+        if match is not None:
+            names.update({int(match.group(1)): re.sub(r'(\s+-?[\d.]+)+$', '', match.group(2))})
+    return names
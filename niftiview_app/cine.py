@@ -0,0 +1,100 @@
+from time import time
+from threading import Condition, Thread
+from collections import OrderedDict, deque
+
+
+class CinePlayer:
+    def __init__(self, render, n_frames, start=0, fps=10, buffer_size=16):
+        self.render = render
+        self.n_frames = n_frames
+        self.start = start
+        self.fps = fps
+        self.buffer_size = min(buffer_size, n_frames)
+        self.buffer = OrderedDict()
+        self.condition = Condition()
+        self.frame = None
+        self.n_dropped = 0
+        self._render_time = 0.
+        self._start_time = None
+        self._display_times = deque(maxlen=max(2, 2 * int(fps)))
+        self._thread = None
+        self._running = False
+
+    @property
+    def is_running(self):
+        return self._running
+
+    @property
+    def target_frame(self):
+        return (self.start + int((time() - self._start_time) * self.fps)) % self.n_frames
+
+    @property
+    def achieved_fps(self):
+        if len(self._display_times) < 2 or self._display_times[-1] == self._display_times[0]:
+            return 0.
+        return (len(self._display_times) - 1) / (self._display_times[-1] - self._display_times[0])
+
+    @property
+    def lead(self):
+        return int(self._render_time * self.fps) + 1
+
+    def upcoming_frames(self, target=None):
+        target = self.target_frame if target is None else target
+        n_upcoming = min(max(self.buffer_size, self.lead + 1), self.n_frames)
+        return [(target + i) % self.n_frames for i in range(n_upcoming)]
+
+    def start_playback(self):
+        self._start_time = time()
+        self._running = True
+        self._thread = Thread(target=self._prefetch, daemon=True)
+        self._thread.start()
+
+    def stop_playback(self):
+        with self.condition:
+            self._running = False
+            self.condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        self.buffer.clear()
+
+    def set_fps(self, fps):
+        if self._start_time is not None:
+            self.start = self.target_frame
+            self._start_time = time()
+        self.fps = fps
+        self._display_times = deque(maxlen=max(2, 2 * int(fps)))
+
+    def pop_frame(self):
+        with self.condition:
+            target = self.target_frame
+            if target == self.frame:
+                return None
+            upcoming = self.upcoming_frames(target)
+            for t in [t for t in self.buffer if t not in upcoming]:
+                self.buffer.pop(t)
+            self.condition.notify_all()
+            if target not in self.buffer:
+                return None
+            skipped = (target - self.frame) % self.n_frames - 1 if self.frame is not None else 0
+            self.n_dropped += max(skipped, 0)
+            self.frame = target
+            self._display_times.append(time())
+            return target, self.buffer.pop(target)
+
+    def _prefetch(self):
+        while True:
+            with self.condition:
+                if not self._running:
+                    return
+                upcoming = self.upcoming_frames()
+                missing = [t for t in upcoming[min(self.lead, len(upcoming) - 1):] if t not in self.buffer]
+                if not missing:
+                    self.condition.wait(timeout=1 / self.fps)
+                    continue
+            start_time = time()
+            image = self.render(missing[0])
+            duration = time() - start_time
+            with self.condition:
+                self._render_time = .8 * self._render_time + .2 * duration if self._render_time else duration
+                if missing[0] in self.upcoming_frames():
+                    self.buffer.update({missing[0]: image})
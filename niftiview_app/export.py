@@ -0,0 +1,132 @@
+import zlib
+import struct
+import numpy as np
+from pathlib import Path
+from threading import Event, Thread
+from tempfile import TemporaryDirectory
+from niftiview.grid import get_grid_boxes, get_color_values
+
+from niftiview_app.tiles import get_grid_shape
+EXPORT_BAND_HEIGHT = 256
+EXPORT_MAX_PATCH_PIXELS = 2 ** 26
+PNG_CHUNK_SIZE = 2 ** 20
+PNG_COLOR_TYPES = {'L': 0, 'RGB': 2, 'RGBA': 6}
+
+
+class PosterExport(Thread):
+    def __init__(self, niigrid, filepath, config_dict, band_height=EXPORT_BAND_HEIGHT):
+        super().__init__(daemon=True)
+        self.niigrid = niigrid
+        self.filepath = filepath
+        self.config_dict = {k: v for k, v in config_dict.items() if k != 'tmp_height'}
+        self.band_height = band_height
+        self.n_patches = len(niigrid)
+        self.n_rendered = 0
+        self.written_fraction = 0.
+        self.size = None
+        self.error = None
+        self.is_done = False
+        self._stop_event = Event()
+
+    @property
+    def progress(self):
+        return (self.n_rendered + self.written_fraction) / (self.n_patches + 1)
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        try:
+            tmp_dirpath = Path(self.filepath).parent
+            with TemporaryDirectory(prefix='.poster_', dir=tmp_dirpath) as tmpdir:
+                sizes, mode = self.render_patches(tmpdir)
+                if not self._stop_event.is_set():
+                    self.write_png(tmpdir, sizes, mode)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.is_done = True
+
+    def render_patches(self, tmpdir):
+        sizes, mode = [], None
+        for i in range(self.n_patches):
+            if self._stop_event.is_set():
+                break
+            width, height = self.niigrid.get_patch_size(i, **self.config_dict)
+            if width * height > EXPORT_MAX_PATCH_PIXELS:
+                raise ValueError(f'Grid cell of {width}x{height} pixels is too large, reduce the poster height')
+            im = self.niigrid.get_patch(i, **self.config_dict)
+            mode = (im.mode if im.mode in PNG_COLOR_TYPES else 'RGB') if mode is None else mode
+            np.save(f'{tmpdir}/{i}.npy', np.asarray(im if im.mode == mode else im.convert(mode)))
+            sizes.append(im.size)
+            del im
+            self.n_rendered += 1
+        return sizes, mode
+
+    def write_png(self, tmpdir, sizes, mode):
+        shape = get_grid_shape(len(sizes), self.config_dict['layout'], self.config_dict['nrows'])
+        boxes = get_grid_boxes(sizes, ncols=shape[1])
+        self.size = (max([box[2] for box in boxes]), max([box[3] for box in boxes]))
+        pad_values = get_color_values(self.config_dict.get('cbar_pad_color', 'k'), len(mode))
+        filepath = f'{self.filepath}.tmp'
+        with open(filepath, 'wb') as f:
+            writer = PngWriter(f, *self.size, mode)
+            for y0 in range(0, self.size[1], self.band_height):
+                if self._stop_event.is_set():
+                    break
+                y1 = min(y0 + self.band_height, self.size[1])
+                band = np.empty((y1 - y0, self.size[0], len(mode)), dtype=np.uint8)
+                band[:] = pad_values
+                for i, box in enumerate(boxes):
+                    if box[1] < y1 and box[3] > y0:
+                        patch = np.load(f'{tmpdir}/{i}.npy', mmap_mode='r')
+                        patch = patch.reshape(*patch.shape[:2], -1)
+                        band[max(box[1], y0) - y0:min(box[3], y1) - y0, box[0]:box[2]] = \
+                            patch[max(box[1], y0) - box[1]:min(box[3], y1) - box[1]]
+                        del patch
+                writer.write_rows(band)
+                self.written_fraction = y1 / self.size[1]
+            writer.close()
+        if self._stop_event.is_set():
+            Path(filepath).unlink(missing_ok=True)
+        else:
+            Path(filepath).replace(self.filepath)
+
+
+class PngWriter:
+    def __init__(self, fileobj, width, height, mode='RGB', level=6):
+        self.fileobj = fileobj
+        self.channels = len(mode)
+        self.compressor = zlib.compressobj(level)
+        self.buffer = []
+        self.buffer_size = 0
+        self.fileobj.write(b'\x89PNG\r\n\x1a\n')
+        self.write_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, PNG_COLOR_TYPES[mode], 0, 0, 0))
+
+    def write_chunk(self, chunk_type, data):
+        self.fileobj.write(struct.pack('>I', len(data)) + chunk_type + data)
+        self.fileobj.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(chunk_type)) & 0xffffffff))
+
+    def write_rows(self, rows):
+        rows, channels = rows.reshape(rows.shape[0], -1), self.channels
+        filtered = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+        filtered[:, 0] = 1
+        filtered[:, 1:channels + 1] = rows[:, :channels]
+        np.subtract(rows[:, channels:], rows[:, :-channels], out=filtered[:, channels + 1:])
+        self.write_data(self.compressor.compress(filtered.tobytes()))
+
+    def write_data(self, data):
+        self.buffer.append(data)
+        self.buffer_size += len(data)
+        if self.buffer_size >= PNG_CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.buffer_size:
+            self.write_chunk(b'IDAT', b''.join(self.buffer))
+        self.buffer, self.buffer_size = [], 0
+
+    def close(self):
+        self.write_data(self.compressor.flush())
+        self.flush()
+        self.write_chunk(b'IEND', b'')
@@ -0,0 +1,41 @@
+import numpy as np
+from niftiview.core import NiftiCore, PLANES
+
+
+class GlassArrays(dict):
+    def __init__(self, array):
+        super().__init__()
+        self.array = array
+
+    def __missing__(self, glass_mode):
+        projections = Projections(self.array, glass_mode)
+        self[glass_mode] = projections
+        return projections
+
+
+class Projections(dict):
+    def __init__(self, array, glass_mode):
+        super().__init__()
+        self.array = array
+        self.glass_mode = glass_mode
+
+    def __missing__(self, plane):
+        axis = PLANES.index(plane)
+        if hasattr(self.array, 'project'):
+            projection = self.array.project(self.glass_mode, axis)
+        else:
+            projection = project(self.array[..., 0], self.glass_mode, axis)
+        self[plane] = projection
+        return projection
+
+
+class LazyGlassCore(NiftiCore):
+    @staticmethod
+    def get_glass_arrays(array):
+        return GlassArrays(array)
+
+
+def project(volume, glass_mode, axis):
+    if glass_mode == 'absmax':
+        return np.abs(volume).max(axis)
+    return volume.max(axis) if glass_mode == 'max' else volume.min(axis)
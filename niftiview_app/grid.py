@@ -0,0 +1,360 @@
+import numpy as np
+import nibabel as nib
+from PIL import Image
+from copy import copy
+from functools import partial
+from threading import RLock
+from contextlib import ExitStack
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from niftiview.glass import GlassBrain
+from niftiview.image import NiftiImage, Overlay, blend_image_layers, to_numpy
+from niftiview.grid import NiftiImageGrid, optimal_shape, get_grid_boxes, compose_image
+
+from niftiview_app.glass import LazyGlassCore
+from niftiview_app.gzindex import load_nifti
+from niftiview_app.memory import get_nbytes, get_nii_nbytes
+from niftiview_app.native import NativeCore, is_native, get_canonical_affine
+from niftiview_app.pyramid import build_pyramids, get_level_factor, pyramid_level
+from niftiview_app.resample import get_core_images
+FRAME_CACHE_SIZE = 8
+
+
+class LazyNifti:
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.nib_image = load_nifti(filepath)
+
+    @property
+    def n_frames(self):
+        shape = self.nib_image.shape
+        return shape[3] if len(shape) > 3 else 1
+
+    def get_frame(self, t=0):
+        if self.n_frames == 1:
+            return self.nib_image if self.nib_image.get_filename() else nib.load(self.filepath)
+        array = np.asanyarray(self.nib_image.dataobj[..., min(t, self.n_frames - 1)])
+        return nib.Nifti1Image(array, self.nib_image.affine, self.nib_image.header)
+
+
+class FrameImage(NiftiImage):
+    def __init__(self, lazy_niftis, t=0, native=True):
+        if native:
+            self.nics = get_native_cores(lazy_niftis, t)
+            self.glassbrain = GlassBrain()
+            self.cmaps = None
+            self.image = None
+            self.overlay = None
+        else:
+            super().__init__(nib_images=[lazy_nifti.get_frame(t) for lazy_nifti in lazy_niftis])
+        for nic, lazy_nifti in zip(self.nics, lazy_niftis):
+            nic.filepath = lazy_nifti.filepath
+            nic.full_shape = (*nic.shape[:3], *lazy_nifti.nib_image.shape[3:])
+            nic.full_header = lazy_nifti.nib_image.header
+        self.layers = None
+        self.layers_key = None
+        self.image_key = None
+        self.image_props_args = None
+
+    def get_base_image(self, origin, layout, height, aspect_ratios, coord_sys, resizing, glass_mode, cmap, transp_if,
+                       qrange, vrange, equal_hist, is_atlas, alpha, linewidth, tmp_height, cbar, cbar_vertical=True,
+                       cbar_pad=0, factor=1, images=None):
+        height, layer_height, layers_key = self.get_layers_args(origin, layout, height, aspect_ratios, coord_sys,
+                                                                resizing, glass_mode, cmap, transp_if, qrange, vrange,
+                                                                equal_hist, is_atlas, linewidth, tmp_height, cbar,
+                                                                cbar_vertical, cbar_pad, factor)
+        self.image_props_args = (origin, layout, height, aspect_ratios, coord_sys)
+        if layers_key != self.layers_key:
+            self.layers = self.get_image_layers(origin, layout, layer_height, aspect_ratios, coord_sys, resizing,
+                                                glass_mode, cmap, transp_if, qrange, vrange, equal_hist, is_atlas,
+                                                linewidth, bool(cbar), images)
+            if len(self.layers) > 1:
+                self.layers = [im if im.mode == 'RGBA' else im.convert('RGBA') for im in self.layers]
+            if layer_height != height:
+                for nic in self.nics:
+                    nic._set_image_properties(origin, layout, height, aspect_ratios, coord_sys)
+            self.layers_key = layers_key
+            self.image_key = None
+        elif glass_mode:
+            for nic in self.nics:
+                nic._set_image_properties(origin, layout, height, aspect_ratios, coord_sys)
+        if repr(alpha) != self.image_key:
+            self.image = blend_image_layers([self.layers[0]] + [im.copy() for im in self.layers[1:]], alpha)
+            if self.image.size != self.nics[0].image_size:
+                self.image = self.image.resize(size=self.nics[0].image_size, resample=0)
+            self.image_key = repr(alpha)
+        return self.image
+
+    def copy(self):
+        nii = copy(self)
+        nii.nics = [copy(nic) for nic in self.nics]
+        nii.glassbrain = GlassBrain()
+        nii.cmaps, nii.image, nii.overlay = None, None, None
+        nii.layers, nii.layers_key, nii.image_key = None, None, None
+        return nii
+
+    def get_layers_args(self, origin, layout, height, aspect_ratios, coord_sys, resizing, glass_mode, cmap, transp_if,
+                        qrange, vrange, equal_hist, is_atlas, linewidth, tmp_height, cbar, cbar_vertical=True,
+                        cbar_pad=0, factor=1):
+        height = height - cbar_pad if cbar and not cbar_vertical else height
+        layer_height = height if tmp_height is None else min(height, tmp_height)
+        layers_key = repr((None if glass_mode else origin, layout, height, aspect_ratios, coord_sys, resizing,
+                           glass_mode, cmap, transp_if, qrange, vrange, equal_hist, is_atlas,
+                           linewidth if glass_mode else None, tmp_height, cbar, factor))
+        return height, layer_height, layers_key
+
+    def get_resize_modes(self, resizing):
+        return [int(i == 0 if resizing is None else resizing if isinstance(resizing, int) else resizing[i])
+                for i in range(len(self.nics))]
+
+    def set_image_properties(self):
+        for nic in self.nics:
+            nic._set_image_properties(*self.image_props_args)
+
+    def get_image_layers(self, origin, layout, height, aspect_ratios, coord_sys, resizing, glass_mode, cmap, transp_if,
+                         qrange, vrange, equal_hist, is_atlas, linewidth, force_rgba, images=None):
+        if images is None:
+            images = get_core_images(self.nics, len(self.nics) * [origin], layout, height, aspect_ratios, coord_sys,
+                                     self.get_resize_modes(resizing), glass_mode)
+        self.cmaps, layers = [], []
+        for i, (nic, im) in enumerate(zip(self.nics, images)):
+            colormap = self.get_cmap(nic, i, cmap, transp_if, qrange, vrange, equal_hist, is_atlas, force_rgba)
+            layers.append(Image.fromarray(colormap(im)))
+            self.cmaps.append(colormap)
+        if glass_mode is not None:
+            layers[0] = self.glassbrain.get_image(self.nics[0], linewidth=linewidth)
+        return layers
+
+    def draw_overlay(self, im, crosshair, fpath, coordinates, header, histogram, cbar, title, fontsize, linecolor,
+                     linewidth, **cbar_kwargs):
+        if crosshair or fpath or coordinates or header or histogram or cbar or title is not None:
+            nic = copy(self.nics[0])
+            nic.shape, nic.header = nic.full_shape, nic.full_header
+            self.overlay = Overlay(nic, self.cmaps[-1], self.cmaps[-1].vrange[0], self.cmaps[-1].vrange[-1])
+            im = self.overlay.draw(im, crosshair, fpath, coordinates, header, histogram, cbar, title, fontsize,
+                                   linecolor, linewidth, **cbar_kwargs)
+        return im
+
+
+class ImageGrid(NiftiImageGrid):
+    def __init__(self, filepaths, t=0, cache_size=FRAME_CACHE_SIZE, pyramid=True, native=True):
+        filepaths = [filepaths] if isinstance(filepaths, str) else filepaths
+        self.filepaths = [[fps] if isinstance(fps, str) else list(fps) for fps in filepaths]
+        self.lazy_niftis = [[LazyNifti(fp) for fp in fpaths] for fpaths in self.filepaths]
+        self.cache_size = cache_size
+        self.pyramid = pyramid
+        self.native = native
+        self.memory = None
+        self.group = None
+        self.frames = OrderedDict()
+        self.sorted_arrays = None
+        self.lock = RLock()
+        self.niis = None
+        self.t = None
+        self.shape = None
+        self.boxes = None
+        self.patches = None
+        self.set_time(t)
+
+    @property
+    def n_frames(self):
+        return max([lazy_niftis[0].n_frames for lazy_niftis in self.lazy_niftis])
+
+    def set_time(self, t):
+        t = min(max(int(round(t)), 0), self.n_frames - 1)
+        with self.lock:
+            if t != self.t:
+                is_cached = t in self.frames
+                self.niis = self.get_frame(t)
+                self.t = t
+                if self.memory is not None and not is_cached:
+                    self.register_frame(t, self.niis)
+                elif self.memory is not None:
+                    self.memory.touch((id(self), 'frames', t))
+
+    def set_memory(self, memory, group):
+        with self.lock:
+            self.memory, self.group = memory, group
+            self.memory.register((id(self), 'sorted_arrays'), get_nbytes(self.sorted_arrays), group, 'frames')
+            for t, niis in self.frames.items():
+                self.register_frame(t, niis)
+
+    def register_frame(self, t, niis):
+        nbytes = sum([get_nii_nbytes(nii) for nii in niis]) - get_nbytes(self.sorted_arrays)
+        self.memory.register((id(self), 'frames', t), nbytes, self.group, 'frames', partial(self.evict_frame, t))
+
+    def get_frame(self, t):
+        with self.lock:
+            if t in self.frames:
+                self.frames.move_to_end(t)
+                return self.frames[t]
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                niis = list(executor.map(lambda lazy_niftis: FrameImage(lazy_niftis, t, self.native), self.lazy_niftis))
+            self.pin_sorted_arrays(niis)
+            if self.pyramid:
+                for nii in niis:
+                    build_pyramids(nii, t)
+            self.frames.update({t: niis})
+            while len(self.frames) > self.cache_size:
+                self.release_frame(*self.frames.popitem(last=False))
+            return niis
+
+    def pin_sorted_arrays(self, niis):
+        if self.sorted_arrays is None:
+            self.sorted_arrays = [[nic.sorted_array for nic in nii.nics] for nii in niis]
+        else:
+            for nii, sorted_arrays in zip(niis, self.sorted_arrays):
+                for nic, sorted_array in zip(nii.nics, sorted_arrays):
+                    nic.sorted_array = sorted_array
+
+    def release_frame(self, t, niis):
+        if self.memory is not None:
+            self.memory.unregister((id(self), 'frames', t))
+            for nii in niis:
+                self.memory.unregister((id(self), 'layers', id(nii)))
+
+    def evict_frame(self, t):
+        if t == self.t or not self.lock.acquire(blocking=False):
+            return False
+        try:
+            if t in self.frames:
+                self.release_frame(t, self.frames.pop(t))
+        finally:
+            self.lock.release()
+
+    def evict_layers(self, nii):
+        if not self.lock.acquire(blocking=False):
+            return False
+        try:
+            nii.layers, nii.layers_key, nii.image_key = None, None, None
+        finally:
+            self.lock.release()
+
+    def get_image(self, origin=(0, 0, 0), layout='all', height=400, squeeze=False, coord_sys=None, resizing=None,
+                  glass_mode=None, cmap=None, transp_if=None, qrange=None, vrange=None, equal_hist=False,
+                  is_atlas=False, alpha=.5, crosshair=False, fpath=False, coordinates=False, header=False,
+                  histogram=False, cbar=False, title=None, fontsize=20, linecolor='white', linewidth=2, tmp_height=None,
+                  nrows=None, as_array=False, **cbar_kwargs):
+        is_single_origin = isinstance(origin[0], (int, float, np.integer, np.floating))
+        org = origin if is_single_origin else origin[0]
+        with self.lock:
+            self.set_time(org[3] if len(org) > 3 else 0)
+            factors = self.get_level_factors(layout, height, squeeze, coord_sys, tmp_height, nrows)
+            origin = len(self) * [origin] if is_single_origin else origin
+            aspect_ratios = self.get_median_aspect_ratios() if squeeze else None
+            titles = title if isinstance(title, list) else len(self) * [title]
+            self.shape = optimal_shape(len(self), layout) if nrows is None else (nrows, int(np.ceil(len(self) / nrows)))
+            nii_tmp_height = None if tmp_height is None else tmp_height // self.shape[0]
+            cbar_size_kwargs = {k: cbar_kwargs[k] for k in ('cbar_vertical', 'cbar_pad') if k in cbar_kwargs}
+            images = []
+            with ExitStack() as stack:
+                for nii, factor in zip(self.niis, factors):
+                    stack.enter_context(pyramid_level(nii.nics, factor))
+                core_images = self.get_core_images(origin, factors, layout, height // self.shape[0], aspect_ratios,
+                                                   coord_sys, resizing, glass_mode, cmap, transp_if, qrange, vrange,
+                                                   equal_hist, is_atlas, linewidth, nii_tmp_height, cbar,
+                                                   **cbar_size_kwargs)
+                for nii, org, factor, ims in zip(self.niis, origin, factors, core_images):
+                    images.append(nii.get_base_image(org, layout, height // self.shape[0], aspect_ratios, coord_sys,
+                                                     resizing, glass_mode, cmap, transp_if, qrange, vrange, equal_hist,
+                                                     is_atlas, alpha, linewidth, nii_tmp_height, cbar, factor=factor,
+                                                     images=ims, **cbar_size_kwargs))
+            self.patches = []
+            for nii, im, ttl, factor in zip(self.niis, images, titles, factors):
+                if factor > 1:
+                    nii.set_image_properties()
+                self.patches.append(nii.draw_overlay(im.copy(), crosshair, fpath, coordinates, header, histogram, cbar,
+                                                     ttl, fontsize, linecolor, linewidth, **cbar_kwargs))
+            if self.memory is not None:
+                for nii in self.niis:
+                    self.memory.register((id(self), 'layers', id(nii)), get_nbytes(nii.layers), self.group, 'layers',
+                                         partial(self.evict_layers, nii))
+            self.boxes = get_grid_boxes(sizes=[im.size for im in self.patches], ncols=self.shape[1])
+            pad_color = cbar_kwargs.get('cbar_pad_color', 'k')
+            im = compose_image(self.patches, self.boxes, pad_color) if len(self) > 1 else self.patches[0]
+        return to_numpy(im) if as_array else im
+
+    def get_core_images(self, origin, factors, layout, height, aspect_ratios, coord_sys, resizing, glass_mode, cmap,
+                        transp_if, qrange, vrange, equal_hist, is_atlas, linewidth, tmp_height, cbar, **cbar_kwargs):
+        nics, origins, resize_modes, stale, layer_height = [], [], [], [], None
+        for i, (nii, org, factor) in enumerate(zip(self.niis, origin, factors)):
+            _, layer_height, layers_key = nii.get_layers_args(org, layout, height, aspect_ratios, coord_sys, resizing,
+                                                              glass_mode, cmap, transp_if, qrange, vrange, equal_hist,
+                                                              is_atlas, linewidth, tmp_height, cbar, factor=factor,
+                                                              **cbar_kwargs)
+            if layers_key != nii.layers_key:
+                stale.append(i)
+                nics += nii.nics
+                origins += len(nii.nics) * [org]
+                resize_modes += nii.get_resize_modes(resizing)
+        core_images = len(self) * [None]
+        if stale:
+            images = get_core_images(nics, origins, layout, layer_height, aspect_ratios, coord_sys, resize_modes,
+                                     glass_mode)
+            for i in stale:
+                core_images[i], images = images[:len(self.niis[i].nics)], images[len(self.niis[i].nics):]
+        return core_images
+
+    def get_patch(self, index, origin=(0, 0, 0), layout='all', height=400, squeeze=False, coord_sys=None,
+                  resizing=None, glass_mode=None, cmap=None, transp_if=None, qrange=None, vrange=None,
+                  equal_hist=False, is_atlas=False, alpha=.5, crosshair=False, fpath=False, coordinates=False,
+                  header=False, histogram=False, cbar=False, title=None, fontsize=20, linecolor='white', linewidth=2,
+                  nrows=None, **cbar_kwargs):
+        is_single_origin = isinstance(origin[0], (int, float, np.integer, np.floating))
+        org = origin if is_single_origin else origin[0]
+        with self.lock:
+            t = min(max(int(round(org[3] if len(org) > 3 else 0)), 0), self.n_frames - 1)
+            is_cached = t in self.frames
+            niis = self.get_frame(t)
+            if self.memory is not None and not is_cached:
+                self.register_frame(t, niis)
+            nii = niis[index].copy()
+            shape = optimal_shape(len(self), layout) if nrows is None else (nrows, int(np.ceil(len(self) / nrows)))
+            aspect_ratios = self.get_median_aspect_ratios() if squeeze else None
+        cbar_size_kwargs = {k: cbar_kwargs[k] for k in ('cbar_vertical', 'cbar_pad') if k in cbar_kwargs}
+        im = nii.get_base_image(origin if is_single_origin else origin[index], layout, height // shape[0],
+                                aspect_ratios, coord_sys, resizing, glass_mode, cmap, transp_if, qrange, vrange,
+                                equal_hist, is_atlas, alpha, linewidth, None, cbar, **cbar_size_kwargs)
+        return nii.draw_overlay(im.copy(), crosshair, fpath, coordinates, header, histogram, cbar,
+                                title[index] if isinstance(title, list) else title, fontsize, linecolor, linewidth,
+                                **cbar_kwargs)
+
+    def get_patch_size(self, index, layout='all', height=400, squeeze=False, coord_sys=None, nrows=None, **kwargs):
+        with self.lock:
+            shape = optimal_shape(len(self), layout) if nrows is None else (nrows, int(np.ceil(len(self) / nrows)))
+            aspect_ratios = self.get_median_aspect_ratios() if squeeze else None
+            nic = self.niis[index].nics[0]
+            image_props = nic.get_image_properties(None, layout, height // shape[0], aspect_ratios, coord_sys)
+        return (max([kw['box'][0] + kw['size'][0] for kw in image_props]),
+                max([kw['box'][1] + kw['size'][1] for kw in image_props]))
+
+    def get_level_factors(self, layout, height, squeeze, coord_sys, tmp_height, nrows):
+        if not self.pyramid or tmp_height is None or tmp_height >= height or coord_sys == 'array_idx':
+            return len(self) * [1]
+        nrows = optimal_shape(len(self), layout)[0] if nrows is None else nrows
+        aspect_ratios = self.get_median_aspect_ratios() if squeeze else None
+        factors = []
+        for nii in self.niis:
+            image_props = nii.nics[0].get_image_properties(None, layout, tmp_height // nrows, aspect_ratios, coord_sys)
+            factors.append(get_level_factor(nii.nics, image_props))
+        return factors
+
+    def save_image(self, filepath, origin=(0, 0, 0), *args, **kwargs):
+        org = origin if isinstance(origin[0], (int, float, np.integer, np.floating)) else origin[0]
+        with self.lock:
+            self.set_time(org[3] if len(org) > 3 else 0)
+            return super().save_image(filepath, origin, *args, **kwargs)
+
+
+def get_native_cores(lazy_niftis, t=0):
+    nics = []
+    for lazy_nifti in lazy_niftis:
+        nib_image = lazy_nifti.nib_image
+        target_affine = nics[0].affine if nics else None
+        if is_native(nib_image) and (target_affine is None or np.array_equal(get_canonical_affine(nib_image),
+                                                                              target_affine)):
+            nics.append(NativeCore(nib_image, None if lazy_nifti.n_frames == 1 else min(t, lazy_nifti.n_frames - 1)))
+        else:
+            nics.append(LazyGlassCore(nib_image=lazy_nifti.get_frame(t), target_affine=target_affine,
+                                      target_shape=nics[0].shape[:3] if nics else None))
+    return nics
@@ -0,0 +1,72 @@
+import os
+import nibabel as nib
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+try:
+    from indexed_gzip import IndexedGzipFile
+except ImportError:
+    IndexedGzipFile = None
+
+from niftiview_app.utils import CACHE_PATH, get_file_key
+GZIP_INDEX_PATH = f'{CACHE_PATH}/gzip_index'
+GZIP_INDEX_SPACING = 4 * 2 ** 20
+GZIP_BUFFER_SIZE = 2 ** 20
+GZIP_INDEX_CACHE_SIZE = 2 ** 30
+GZIP_INDEX_EXECUTOR = ThreadPoolExecutor(max_workers=1)
+GZIP_INDEX_FUTURES = {}
+
+
+def load_nifti(filepath):
+    if IndexedGzipFile is None or not str(filepath).endswith('.gz'):
+        return nib.load(filepath)
+    try:
+        index_filepath = get_index_filepath(filepath)
+        if Path(index_filepath).is_file():
+            fileobj = IndexedGzipFile(filepath, spacing=GZIP_INDEX_SPACING, index_file=index_filepath,
+                                      buffer_size=GZIP_BUFFER_SIZE)
+            nib_image = nib.Nifti1Image.from_stream(fileobj)
+            os.utime(index_filepath)
+            return nib_image
+        nib_image = nib.load(filepath)
+        if len(nib_image.shape) > 3 and index_filepath not in GZIP_INDEX_FUTURES:
+            GZIP_INDEX_FUTURES[index_filepath] = GZIP_INDEX_EXECUTOR.submit(build_index, filepath, index_filepath)
+        return nib_image
+    except Exception:
+        return nib.load(filepath)
+
+
+def get_index_filepath(filepath):
+    return f'{GZIP_INDEX_PATH}/{get_file_key(filepath)}.gzidx'
+
+
+def build_index(filepath, index_filepath):
+    Path(index_filepath).parent.mkdir(parents=True, exist_ok=True)
+    with IndexedGzipFile(filepath, spacing=GZIP_INDEX_SPACING) as fileobj:
+        fileobj.build_full_index()
+        fileobj.export_index(f'{index_filepath}.tmp')
+    Path(f'{index_filepath}.tmp').replace(index_filepath)
+    GZIP_INDEX_FUTURES.pop(index_filepath, None)
+    evict_indexes(Path(index_filepath).parent)
+
+
+def evict_indexes(path=GZIP_INDEX_PATH, max_bytes=GZIP_INDEX_CACHE_SIZE, fraction=.8):
+    filepaths = sorted(Path(path).glob('*.gzidx'), key=lambda fp: fp.stat().st_mtime)
+    nbytes = sum([fp.stat().st_size for fp in filepaths])
+    if nbytes > max_bytes:
+        for fp in filepaths:
+            if nbytes <= fraction * max_bytes:
+                break
+            size = fp.stat().st_size
+            try:
+                fp.unlink(missing_ok=True)
+            except OSError:
+                continue
+            nbytes -= size
+
+
+def clear_indexes(path=GZIP_INDEX_PATH):
+    for fp in Path(path).glob('*.gzidx'):
+        try:
+            fp.unlink(missing_ok=True)
+        except OSError:
+            pass
@@ -0,0 +1,132 @@
+import os
+import json
+import glob
+import sqlite3
+import nibabel as nib
+from queue import Queue, Empty
+from fnmatch import fnmatch
+from pathlib import Path
+from threading import Lock, Thread
+
+from niftiview_app.utils import CACHE_PATH
+INDEX_PATH = f'{CACHE_PATH}/index.sqlite'
+INDEX_BATCH_SIZE = 64
+
+
+class FileIndex:
+    def __init__(self, filepath=INDEX_PATH):
+        if filepath != ':memory:':
+            Path(filepath).parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(filepath, check_same_thread=False)
+        self.lock = Lock()
+        with self.lock, self.connection:
+            self.connection.execute('CREATE TABLE IF NOT EXISTS headers (path TEXT PRIMARY KEY, size INTEGER, '
+                                    'mtime INTEGER, shape TEXT, dtype TEXT, zooms TEXT, affine TEXT)')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS globs (pattern TEXT PRIMARY KEY, paths TEXT)')
+
+    def get(self, filepath):
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            return None
+        with self.lock:
+            row = self.connection.execute('SELECT shape, dtype, zooms, affine FROM headers WHERE path = ? AND size = ? '
+                                          'AND mtime = ?', (filepath, stat.st_size, stat.st_mtime_ns)).fetchone()
+        if row is None:
+            header = read_header(filepath)
+            if header is not None:
+                self.add(filepath, stat, header)
+            return header
+        return dict(zip(('shape', 'dtype', 'zooms', 'affine'), [json.loads(value) for value in row]))
+
+    def add(self, filepath, stat, header):
+        values = [json.dumps(header[k]) for k in ('shape', 'dtype', 'zooms', 'affine')]
+        values = (filepath, stat.st_size, stat.st_mtime_ns, *values)
+        with self.lock, self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO headers VALUES (?, ?, ?, ?, ?, ?, ?)', values)
+
+    def get_glob(self, pattern):
+        with self.lock:
+            row = self.connection.execute('SELECT paths FROM globs WHERE pattern = ?', (pattern,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def set_glob(self, pattern, filepaths):
+        with self.lock, self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO globs VALUES (?, ?)', (pattern, json.dumps(filepaths)))
+
+
+class Indexer(Thread):
+    def __init__(self, index, filepaths, batch_size=INDEX_BATCH_SIZE, view=1, cached_filepaths=None):
+        super().__init__(daemon=True)
+        self.index = index
+        self.filepaths = filepaths
+        self.batch_size = batch_size
+        self.view = view
+        self.cached_filepaths = cached_filepaths
+        self.n_added = 0 if cached_filepaths is None else len(cached_filepaths)
+        self.batches = Queue()
+        self.indexed_filepaths = []
+        self.is_done = False
+        self._stopped = False
+
+    def run(self):
+        try:
+            is_pattern = isinstance(self.filepaths, str)
+            batch = []
+            for filepath in iglob_sorted(self.filepaths) if is_pattern else self.filepaths:
+                if self._stopped:
+                    return
+                if is_displayable(self.index.get(filepath)):
+                    batch.append(filepath)
+                    self.indexed_filepaths.append(filepath)
+                if len(batch) == self.batch_size:
+                    self.batches.put(batch)
+                    batch = []
+            if batch:
+                self.batches.put(batch)
+            if is_pattern:
+                self.index.set_glob(self.filepaths, self.indexed_filepaths)
+        finally:
+            self.is_done = True
+
+    def stop(self):
+        self._stopped = True
+
+    def get_batches(self):
+        batches = []
+        while True:
+            try:
+                batches.append(self.batches.get_nowait())
+            except Empty:
+                return batches
+
+
+def read_header(filepath):
+    try:
+        nib_image = nib.load(filepath)
+    except Exception:
+        return None
+    header = nib_image.header
+    return {'shape': list(nib_image.shape), 'dtype': header.get_data_dtype().name,
+            'zooms': [float(z) for z in header.get_zooms()], 'affine': nib_image.affine.tolist()}
+
+
+def is_displayable(header):
+    return header is not None and len(header['shape']) in (3, 4) and min(header['shape']) > 0
+
+
+def iglob_sorted(pattern):
+    if not glob.has_magic(pattern):
+        if os.path.exists(pattern):
+            yield pattern
+        return
+    dirname, basename = os.path.split(pattern)
+    dirnames = iglob_sorted(dirname) if glob.has_magic(dirname) else [dirname]
+    for dirname in dirnames:
+        try:
+            names = sorted(os.listdir(dirname or os.curdir))
+        except OSError:
+            continue
+        for name in names:
+            if fnmatch(name, basename) and (not name.startswith('.') or basename.startswith('.')):
+                yield os.path.join(dirname, name)
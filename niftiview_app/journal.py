@@ -0,0 +1,92 @@
+import os
+import csv
+from pathlib import Path
+from threading import Lock, Thread
+
+from niftiview_app.utils import CACHE_PATH
+JOURNAL_PATH = f'{CACHE_PATH}/annotations.csv'
+JOURNAL_MIN_LINES = 1024
+
+
+class AnnotationJournal:
+    def __init__(self, filepath=JOURNAL_PATH):
+        self.filepath = filepath
+        self.lock = Lock()
+        self.annotations = None
+        self.file = None
+        self.n_lines = 0
+        self._pending = None
+        self._thread = None
+
+    def load(self):
+        with self.lock:
+            if self.annotations is None:
+                self.annotations = {}
+                if Path(self.filepath).is_file():
+                    with open(self.filepath, newline='') as file:
+                        for row in csv.reader(file):
+                            self.n_lines += 1
+                            if len(row) == 2 and row[1].lstrip('-').isdigit():
+                                self.annotations.update({row[0]: int(row[1])})
+            return self.annotations
+
+    def append(self, filepath, annotation):
+        self.load()
+        with self.lock:
+            if self.file is None:
+                self.file = open_journal(self.filepath)
+            csv.writer(self.file).writerow([filepath, annotation])
+            self.file.flush()
+            self.annotations.update({filepath: annotation})
+            self.n_lines += 1
+            if self._pending is not None:
+                self._pending.append([filepath, annotation])
+            elif self.n_lines > 2 * len(self.annotations) + JOURNAL_MIN_LINES:
+                self._pending = []
+                self._thread = Thread(target=self.compact, args=(dict(self.annotations),), daemon=True)
+                self._thread.start()
+
+    def compact(self, annotations):
+        tmp_filepath = f'{self.filepath[:-4]}.tmp.csv'
+        with open(tmp_filepath, 'w', newline='') as file:
+            csv.writer(file).writerows(annotations.items())
+        with self.lock:
+            with open(tmp_filepath, 'a', newline='') as file:
+                csv.writer(file).writerows(self._pending)
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+            os.replace(tmp_filepath, self.filepath)
+            self.n_lines = len(annotations) + len(self._pending)
+            self._pending = None
+
+    def close(self):
+        if self._thread is not None:
+            self._thread.join()
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def open_journal(filepath):
+    Path(filepath).parent.mkdir(parents=True, exist_ok=True)
+    is_terminated = True
+    if Path(filepath).is_file() and Path(filepath).stat().st_size > 0:
+        with open(filepath, 'rb') as file:
+            file.seek(-1, os.SEEK_END)
+            is_terminated = file.read(1) == b'\n'
+    file = open(filepath, 'a', newline='')
+    if not is_terminated:
+        file.write('\n')
+    return file
+
+
+def get_first_unannotated_index(filepaths, annotations):
+    for i, filepath in enumerate(filepaths):
+        if filepath not in annotations:
+            return i
+    return None
+
+
+ANNOTATION_JOURNAL = AnnotationJournal()
@@ -4,10 +4,13 @@ from time import time
 from copy import deepcopy
 from PIL import Image, ImageTk
 from functools import partial
+from threading import current_thread, main_thread
+from concurrent.futures import ThreadPoolExecutor
 from warnings import filterwarnings
 from webbrowser import open_new_tab
 from customtkinter import (filedialog, set_appearance_mode, set_widget_scaling, CTk, CTkEntry, CTkFrame, CTkLabel,
-                           CTkButton, CTkTabview, CTkToplevel, CTkOptionMenu, CTkCheckBox, CTkSlider, CTkSegmentedButton)
+                           CTkButton, CTkTabview, CTkToplevel, CTkOptionMenu, CTkCheckBox, CTkSlider,
+                           CTkSegmentedButton, CTkInputDialog)
 from tkinterdnd2 import DND_FILES, TkinterDnD
 from CTkMenuBar import CTkMenuBar, CustomDropdownMenu
 from niftiview.cli import save_gif, save_images_or_gifs
@@ -16,10 +19,21 @@ from niftiview.image import QRANGE, CMAPS_IMAGE, CMAPS_MASK
 from niftiview.grid import NiftiImageGrid
 
 from niftiview_app import __version__
+from niftiview_app.atlas import Atlas, load_label_names
+from niftiview_app.cine import CinePlayer
+from niftiview_app.export import PosterExport
+from niftiview_app.grid import ImageGrid
+from niftiview_app.gzindex import GZIP_INDEX_EXECUTOR, clear_indexes
+from niftiview_app.index import FileIndex, Indexer
+from niftiview_app.journal import ANNOTATION_JOURNAL, get_first_unannotated_index
+from niftiview_app.memory import MEMORY_MANAGER, get_nbytes
+from niftiview_app.pyramid import PYRAMID_EXECUTOR, clear_levels
+from niftiview_app.tiles import TileCache
 from niftiview_app.utils import (DATA_PATH, PADCOLORS, LINECOLORS, CONFIG_DICT, TMP_HEIGHTS, LAYER_ATTRIBUTES, dcm2nii,
                                  debounce, set_fullscreen, get_window_frame, parse_dnd_filepaths, Config, CTkSpinbox)
 PLANES_4D = tuple(list(PLANES) + ['time'])
 SCALINGS = (.5, 2/3, .75, 1, 4/3, 1.5, 2)
+CINE_FPS = 10
 OPTIONS = {'Main': ['Layout', '', 'Colormap', '', 'Mask colormap', '', 'Height', 'Max samples'],
            'Image': ['Equalize histogram', 'Percentile range', '', 'Value range', '', 'Transparent if', 'Resizing'],
            'Mask': ['Opacity [%]', 'Percentile range', '', 'Value range', '', 'Transparent if', 'Resizing', 'Is atlas'],
@@ -35,6 +49,8 @@ TUTORIAL_URL = 'https://www.youtube.com/'
 HOMEPAGE_URL = 'https://github.com/codingfisch/niftiview_app'
 AUTHOR_URL = 'https://github.com/codingfisch'
 RELEASE_URL = f'{HOMEPAGE_URL}/releases/tag/v{__version__}'
+LOAD_EXECUTOR = ThreadPoolExecutor(max_workers=1)
+ATLAS_EXECUTOR = ThreadPoolExecutor(max_workers=1)
 
 
 class InputFrame(CTkFrame, TkinterDnD.DnDWrapper):
@@ -213,6 +229,11 @@ class SliderFrame(CTkFrame):
             slider.set(0)
             slider.grid(row=1, column=i, sticky='ns')
             self.sliders.update({plane: slider})
+        self.play_button = CTkButton(self, text='Play', width=100)
+        self.play_button.grid(row=2, column=0, columnspan=2, sticky='nsew', padx=1, pady=1)
+        self.fps_spinbox = CTkSpinbox(self, width=100, from_=1, to=60)
+        self.fps_spinbox.set(CINE_FPS)
+        self.fps_spinbox.grid(row=2, column=2, columnspan=2, sticky='nsew', padx=1, pady=1)
 
 
 class PagesFrame(CTkFrame):
@@ -249,6 +270,8 @@ class SidebarFrame(CTkFrame):
         if not toplevel:
             self.pages_frame = PagesFrame(self, config=config, width=self.sliders_frame._desired_width)
             self.pages_frame.grid(row=4, **grid_kwargs)
+        self.memory_label = CTkLabel(self, text='', font=('', 10), justify='left')
+        self.memory_label.grid(row=5, **grid_kwargs)
 
 
 class MainFrame(CTkFrame):
@@ -270,20 +293,34 @@ class MainFrame(CTkFrame):
         self.image_frame.grid(row=0, column=1, sticky='nsew')
         self.image_label = CTkLabel(self.image_frame, text='')
         self.image_label.grid(sticky='nsew')
+        self.atlas_label = CTkLabel(self.image_frame, text='', fg_color=('gray78', 'gray28'), corner_radius=6)
 
         self.time_dropdown_clicked = time()
         self.fullscreen_height_change = False
 
         self.niigrid1 = None
         self.niigrid2 = None
-        self.load_niigrid()
         self.image = None
         self.image_grid_boxes = None
         self.image_grid_numbers = None
         self.image_overlay = None
         self.image_origin_coords = None
+        self.atlases = {}
+        self._atlas_futures = {}
+        self.cine = None
+        self._cine_timer = None
+        self._niigrid_futures = {1: None, 2: None}
+        self.tile_cache = TileCache()
+        self._page_tiles = None
+        self.file_index = FileIndex()
+        self.indexer = None
+        self.poster_export = None
         self.annotation_buttons = []
-        self.update_image(hd=True)
+        if not toplevel:
+            self.resume_annotations()
+        if not self.show_cached_image():
+            self.load_niigrid()
+            self.update_image(hd=True)
 
         self.sidebar_frame = SidebarFrame(self, config=self.config, toplevel=toplevel)
         self.sidebar_frame.grid(row=0, column=0, sticky='nsew')
@@ -298,6 +335,8 @@ class MainFrame(CTkFrame):
             self.set_input_frame()
         self.sidebar_frame.clear_mask_button.configure(command=self.clear_masks)
         self.add_sliders_commands(self.sidebar_frame.sliders_frame.sliders)
+        self.sidebar_frame.sliders_frame.play_button.configure(command=self.set_cine)
+        self.sidebar_frame.sliders_frame.fps_spinbox.configure(command=self.set_cine_fps)
         self.sidebar_frame.options_frame.show_button.configure(command=self.set_options_frame)
         if not toplevel:
             self.sidebar_frame.pages_frame.previous_button.configure(command=self.set_page)
@@ -332,6 +371,7 @@ class MainFrame(CTkFrame):
         save_image_submenu = save_dropdown.add_submenu('Save image as')
         for ftype in FILETYPES:
             save_image_submenu.add_option(ftype[1], command=partial(self.save_image, ftype))
+        save_dropdown.add_option('Save poster...', command=self.save_poster)
         save_dropdown.add_option('Save all images', command=self.save_all_images_or_gifs)
         save_dropdown.add_option('Save GIF', command=self.save_gif)
         save_dropdown.add_option('Save all GIFs', command=partial(self.save_all_images_or_gifs, gif=True))
@@ -373,6 +413,9 @@ class MainFrame(CTkFrame):
         glass_mode_submenu = extra_options_dropdown.add_submenu('Glassbrain mode')
         for glass_mode in [None] + list(GLASS_MODES):
             glass_mode_submenu.add_option(option=glass_mode, command=partial(self.update_config, attribute='glass_mode', event=glass_mode))
+        extra_options_dropdown.add_option(option='Clear thumbnail cache', command=self.clear_tile_cache)
+        extra_options_dropdown.add_option(option='Clear pyramid cache', command=self.clear_pyramid_cache)
+        extra_options_dropdown.add_option(option='Clear gzip index cache', command=self.clear_gzip_index_cache)
         coord_sys_submenu = extra_options_dropdown.add_submenu('Coordinate system')
         for coord_sys in COORDINATE_SYSTEMS:
             coord_sys_submenu.add_option(option=coord_sys, command=partial(self.update_config, attribute='coord_sys', event=coord_sys))
@@ -453,12 +496,141 @@ class MainFrame(CTkFrame):
     def niigrid(self):
         return [self.niigrid1, self.niigrid2][self.config.view - 1]
 
-    def load_niigrid(self):
-        setattr(self, f'niigrid{self.config.view}', NiftiImageGrid(self.config.get_filepaths()))
+    @property
+    def is_loading(self):
+        return self.niigrid is None or self._niigrid_futures[self.config.view] is not None
+
+    def load_niigrid(self, niigrid=None, view=None):
+        view = view or self.config.view
+        if niigrid is None:
+            self._niigrid_futures[view] = None
+            niigrid = ImageGrid(self.config.get_filepaths(), self.config.origin[3])
+        if view == self.config.view:
+            self.image_grid_boxes = None
+        if getattr(self, f'niigrid{view}') is not None:
+            MEMORY_MANAGER.release(id(getattr(self, f'niigrid{view}')))
+        setattr(self, f'niigrid{view}', niigrid)
+        group = self.get_memory_group(view)
+        niigrid.set_memory(MEMORY_MANAGER, group)
+        MEMORY_MANAGER.register((id(niigrid), 'view'), 0, group, 'view', partial(self.evict_niigrid, view))
+        mask_filepaths = [fpaths[-1] for fpaths in self.config.get_filepaths()]
+        for key in [key for key in self.atlases if key[0] not in mask_filepaths]:
+            MEMORY_MANAGER.unregister((id(self), 'atlases', key))
+            self.atlases.pop(key)
+        for key in [key for key in self._atlas_futures if key[0] not in mask_filepaths]:
+            self._atlas_futures.pop(key)
+        if niigrid is self.niigrid:
+            self.build_atlases()
+
+    def evict_niigrid(self, view):
+        niigrid = getattr(self, f'niigrid{view}')
+        if current_thread() is not main_thread() or view == self.config.view or niigrid is None:
+            return False
+        if not niigrid.lock.acquire(blocking=False):
+            return False
+        try:
+            setattr(self, f'niigrid{view}', None)
+            MEMORY_MANAGER.release(id(niigrid))
+        finally:
+            niigrid.lock.release()
+
+    def drop_niigrid(self, view):
+        niigrid = getattr(self, f'niigrid{view}')
+        self._niigrid_futures[view] = None
+        if niigrid is not None:
+            setattr(self, f'niigrid{view}', None)
+            MEMORY_MANAGER.release(id(niigrid))
+
+    def evict_atlas(self, key):
+        if current_thread() is not main_thread():
+            return False
+        self.atlases.pop(key, None)
+
+    def get_memory_group(self, view=None):
+        return 'Pop-out' if self.toplevel else f'View {view or self.config.view}'
+
+    def account_memory(self):
+        nbytes = get_nbytes([self.image, self._bg_image, self.image_overlay])
+        MEMORY_MANAGER.register((id(self), 'display'), nbytes, self.get_memory_group(), 'display')
+        nbytes = get_nbytes([self.image_grid_numbers, self.image_origin_coords])
+        MEMORY_MANAGER.register((id(self), 'lookup'), nbytes, self.get_memory_group(), 'lookup')
+        MEMORY_MANAGER.log_usage()
+        if hasattr(self, 'sidebar_frame'):
+            self.sidebar_frame.memory_label.configure(text=MEMORY_MANAGER.get_usage_text())
+
+    def destroy(self):
+        self.stop_cine()
+        self.store_tiles()
+        if self.poster_export is not None:
+            self.poster_export.stop()
+        for owner in (id(self), id(self.niigrid1), id(self.niigrid2)):
+            MEMORY_MANAGER.release(owner)
+        super().destroy()
+
+    def load_niigrid_async(self):
+        future = LOAD_EXECUTOR.submit(ImageGrid, self.config.get_filepaths(), self.config.origin[3])
+        self._niigrid_futures[self.config.view] = future
+        self.after(20, self.poll_niigrid, future, self.config.view)
+
+    def poll_niigrid(self, future, view):
+        if future is self._niigrid_futures[view]:
+            if future.done():
+                self._niigrid_futures[view] = None
+                self.load_niigrid(future.result(), view)
+                if view == self.config.view:
+                    self.update_image()
+            else:
+                self.after(20, self.poll_niigrid, future, view)
+
+    def show_cached_image(self):
+        config_dict = self.config.to_dict(grid_kwargs_only=True)
+        image = self.tile_cache.get_image(self.config.get_filepaths(), config_dict)
+        if image is None:
+            return False
+        self.stop_cine()
+        self.destroy_annotation_buttons()
+        self.image = image
+        self.clear_grid_lookups()
+        if self._bg_image is None or self._bg_image.size != image.size:
+            self._bg_image = Image.new('RGBA', image.size, self._bg_color_rgba)
+        self.show_image()
+        self.load_niigrid_async()
+        return True
+
+    def clear_grid_lookups(self):
+        self.image_grid_boxes = None
+        self.image_grid_numbers = None
+        self.image_origin_coords = None
+
+    def set_page_tiles(self, hd=True):
+        self._page_tiles = None
+        if hd and self.niigrid.patches is not None:
+            config_dict = self.config.to_dict(grid_kwargs_only=True)
+            keys = self.tile_cache.get_keys(self.config.get_filepaths(), config_dict)
+            if keys is not None:
+                self._page_tiles = (keys, list(self.niigrid.patches))
+
+    def store_tiles(self):
+        if self._page_tiles is not None:
+            self.tile_cache.put_async(*self._page_tiles)
+            self._page_tiles = None
+
+    def clear_tile_cache(self):
+        self.tile_cache.clear()
+        self.time_dropdown_clicked = time()
+
+    def clear_pyramid_cache(self):
+        PYRAMID_EXECUTOR.submit(clear_levels)
+        self.time_dropdown_clicked = time()
+
+    def clear_gzip_index_cache(self):
+        GZIP_INDEX_EXECUTOR.submit(clear_indexes)
+        self.time_dropdown_clicked = time()
 
     def set_view(self, event):
         self.config.view = int(event[-1])
-        if getattr(self, f'niigrid{self.config.view}') is None:
+        self.clear_grid_lookups()
+        if getattr(self, f'niigrid{self.config.view}') is None and self._niigrid_futures[self.config.view] is None:
             self.load_niigrid()
         self.update_image()
 
@@ -485,10 +657,9 @@ class MainFrame(CTkFrame):
         self.update_image()
 
     def set_annotation_buttons(self):
-        self.config.annotations = ~self.config.annotations
-        if len(self.annotation_buttons) > 0:
-            self.destroy_annotation_buttons()
-        else:
+        self.config.annotations = not self.config.annotations
+        self.destroy_annotation_buttons()
+        if self.config.annotations and not self.is_loading:
             self.create_annotation_buttons()
 
     def destroy_annotation_buttons(self):
@@ -500,15 +671,27 @@ class MainFrame(CTkFrame):
     def create_annotation_buttons(self, annotations_=('0', '1', '2')):
         self.annotation_buttons = []
         scaling = self._CTkScalingBaseClass__widget_scaling
-        for nimage, box in zip(self.niigrid1.niis, self.image_grid_boxes):
+        for fpaths, box in zip(self.config.get_filepaths(view=1), self.image_grid_boxes):
             button = CTkSegmentedButton(self.image_frame, values=annotations_,
-                                        command=partial(self.set_annotation, filepath=nimage.nics[0].filepath))
-            button.set(annotations_[0])
+                                        command=partial(self.set_annotation, filepath=fpaths[0]))
+            button.set(str(self.config.annotation_dict.get(fpaths[0], annotations_[0])))
             button.place(x=int(round(box[2] / scaling)), y=int(round(box[1] / scaling)), anchor='ne')
             self.annotation_buttons.append(button)
 
     def set_annotation(self, event, filepath):
         self.config.annotation_dict.update({filepath: int(event)})
+        ANNOTATION_JOURNAL.append(filepath, int(event))
+
+    def restore_annotations(self, filepaths):
+        annotations = ANNOTATION_JOURNAL.load()
+        self.config.annotation_dict.update({fp: annotations[fp] for fp in filepaths if fp in annotations})
+
+    def resume_annotations(self):
+        filepaths = [fpaths[0] for fpaths in self.config.filepaths_view1]
+        self.restore_annotations(filepaths)
+        index = get_first_unannotated_index(filepaths, ANNOTATION_JOURNAL.load())
+        if index is not None and self.config.view == 1:
+            self.config.page = index // self.config.max_samples
 
     def set_cmap(self, event, entry, is_mask=False):
         if event == 'CATALOG':
@@ -550,6 +733,8 @@ class MainFrame(CTkFrame):
         self.update_config('transp_if', transp_if, is_mask=is_mask)
 
     def set_quantile_range(self, event, is_mask=False, stop=False, increment=None):
+        if self.is_loading:
+            return
         if self.config.qrange[-1 if is_mask else 0] is None:
             qrange = list(QRANGE[int(is_mask)])
         else:
@@ -574,12 +759,15 @@ class MainFrame(CTkFrame):
                     self.sidebar_frame.options_frame.qrange_stop_spinbox.set(qrange[1] * 100)
 
     def set_value_range(self, event, is_mask=False, stop=False):
+        if self.is_loading:
+            return
         vrange = self.niigrid.niis[0].cmaps[-1 if is_mask else 0].vrange
         vrange[-1 if stop else 0] = event
         self.update_config('vrange', vrange, is_mask)
 
     def set_is_atlas(self):
         self.update_config('is_atlas', not self.config.is_atlas[-1], is_mask=True)
+        self.build_atlases()
 
     def set_cbar(self, event):
         self.config.cbar_vertical = event == 'vertical'
@@ -592,9 +780,11 @@ class MainFrame(CTkFrame):
     def set_page(self, next=False):
         page = self.config.page + 1 if next else self.config.page - 1
         if page in list(range(self.config.n_pages)):
+            self.store_tiles()
             self.config.page = page
-            self.load_niigrid()
-            self.update_image()
+            if not self.show_cached_image():
+                self.load_niigrid()
+                self.update_image()
             self.sidebar_frame.pages_frame.page_label.configure(text=f'Page {page + 1} of {self.config.n_pages}')
 
     def update_config(self, attribute, event=None, is_mask=False, switch=False):
@@ -625,16 +815,91 @@ class MainFrame(CTkFrame):
                 filepaths = filedialog.askopenfilenames(title=title, filetypes=[('All Files', '*.*')])
         if filepaths:
             self.unset_title()
-            self.config.add_filepaths(filepaths, is_mask)
-            self.load_niigrid()
-            self.update_image()
+            if not is_mask:
+                filepaths = self.index_files(filepaths)
+            if filepaths:
+                self.config.add_filepaths(filepaths, is_mask)
+                if not is_mask:
+                    self.restore_annotations(filepaths)
+                self.load_niigrid()
+                self.update_image()
             self.focus_set()
             if dropdown:
                 self.time_dropdown_clicked = time()
 
+    def index_files(self, filepaths):
+        if self.indexer is not None:
+            self.indexer.stop()
+        cached_filepaths = self.file_index.get_glob(filepaths) if isinstance(filepaths, str) else list(filepaths)
+        self.indexer = Indexer(self.file_index, filepaths, self.config.max_samples, self.config.view, cached_filepaths)
+        self.indexer.start()
+        self.after(20, self.poll_indexer, self.indexer)
+        return self.indexer.cached_filepaths
+
+    def poll_indexer(self, indexer):
+        if indexer is not self.indexer:
+            return
+        is_done = indexer.is_done
+        if indexer.cached_filepaths is None:
+            for batch in indexer.get_batches():
+                self.add_indexed_filepaths(batch, indexer)
+        if is_done:
+            self.indexer = None
+            if indexer.cached_filepaths is not None and indexer.indexed_filepaths != indexer.cached_filepaths:
+                self.reconcile_indexed_filepaths(indexer)
+        else:
+            self.after(50, self.poll_indexer, indexer)
+        if hasattr(self, 'sidebar_frame') and hasattr(self.sidebar_frame, 'pages_frame'):
+            page_text = f'Page {self.config.page + 1} of {self.config.n_pages}{"" if is_done else "+"}'
+            self.sidebar_frame.pages_frame.page_label.configure(text=page_text)
+
+    def add_indexed_filepaths(self, filepaths, indexer):
+        if indexer.n_added == 0 and indexer.view == self.config.view:
+            self.config.add_filepaths(filepaths)
+        else:
+            view_filepaths = [] if indexer.n_added == 0 else getattr(self.config, f'filepaths_view{indexer.view}')
+            setattr(self.config, f'filepaths_view{indexer.view}', view_filepaths + [[fp] for fp in filepaths])
+            if indexer.view == 1:
+                if indexer.n_added == 0:
+                    self.config.annotation_dict = {}
+                self.config.annotation_dict.update({fp: 0 for fp in filepaths})
+        if indexer.view == 1:
+            self.restore_annotations(filepaths)
+        is_first_batch = indexer.n_added == 0
+        indexer.n_added += len(filepaths)
+        if indexer.view != self.config.view:
+            if is_first_batch:
+                self.drop_niigrid(indexer.view)
+        elif is_first_batch or self.config.page == self.config.n_pages - 1:
+            self.load_niigrid()
+            self.update_image()
+
+    def reconcile_indexed_filepaths(self, indexer):
+        view_filepaths = getattr(self.config, f'filepaths_view{indexer.view}')
+        indexed_filepaths = set(indexer.indexed_filepaths)
+        kept_filepaths = [fpaths for fpaths in view_filepaths if fpaths[0] in indexed_filepaths]
+        known_filepaths = set([fpaths[0] for fpaths in kept_filepaths])
+        is_shared_mask = all([fpaths[1:] == view_filepaths[0][1:] for fpaths in view_filepaths])
+        masks = view_filepaths[0][1:] if is_shared_mask and view_filepaths else []
+        added_filepaths = [fp for fp in indexer.indexed_filepaths if fp not in known_filepaths]
+        if not kept_filepaths and not added_filepaths:
+            return
+        setattr(self.config, f'filepaths_view{indexer.view}', kept_filepaths + [[fp] + masks for fp in added_filepaths])
+        if indexer.view == 1:
+            self.config.annotation_dict = {fp: v for fp, v in self.config.annotation_dict.items()
+                                           if fp in indexed_filepaths}
+            self.config.annotation_dict.update({fp: 0 for fp in added_filepaths})
+            self.restore_annotations(added_filepaths)
+        if indexer.view == self.config.view:
+            self.config.page = min(self.config.page, self.config.n_pages - 1)
+            self.load_niigrid()
+            self.update_image()
+        else:
+            self.drop_niigrid(indexer.view)
+
     def remove_mask_layers(self):
         self.config.remove_mask_layers()
-        setattr(self, f'niigrid{self.config.view}', NiftiImageGrid(self.config.get_filepaths()))
+        self.load_niigrid()
         self.update_image()
 
     def update_origin(self, value, plane, scroll_up=True, scroll_speed=0, hd=True):
@@ -645,15 +910,64 @@ class MainFrame(CTkFrame):
         self.update_image(hd)
 
     def update_image(self, hd=True):
+        self.stop_cine()
+        if self.is_loading:
+            return
         self.image = self.get_image(hd)
+        self.set_page_tiles(hd)
         self.update_overlay_and_annotations()
+        self.show_image()
+        self.account_memory()
+        if hasattr(self, 'sidebar_frame'):
+            self.update_sidebar()
+
+    def show_image(self):
         if len(self.image.mode) > 1:
             self.image = Image.alpha_composite(self._bg_image, self.image)
         filterwarnings('ignore', category=UserWarning)
         self.image_label.configure(image=ImageTk.PhotoImage(self.image, size=self.image.size))
         filterwarnings('default', category=UserWarning)
-        if hasattr(self, 'sidebar_frame'):
-            self.update_sidebar()
+
+    def set_cine(self, event=None):
+        if self.cine is not None:
+            self.stop_cine()
+            self.update_image()
+        elif not self.is_loading:
+            n_frames = self.niigrid.n_frames
+            if n_frames > 1:
+                fps = self.sidebar_frame.sliders_frame.fps_spinbox.get() or CINE_FPS
+                start = int(round(self.config.origin[3])) % n_frames
+                render = partial(self.get_cine_image, self.niigrid, self.config.to_dict(grid_kwargs_only=True))
+                self.cine = CinePlayer(render, n_frames, start, fps)
+                self.cine.start_playback()
+                self.show_cine_frame()
+
+    def set_cine_fps(self, fps):
+        if self.cine is not None and fps:
+            self.cine.set_fps(fps)
+
+    def stop_cine(self):
+        if self.cine is not None:
+            if self._cine_timer is not None:
+                self.after_cancel(self._cine_timer)
+                self._cine_timer = None
+            self.cine.stop_playback()
+            self.cine = None
+            self.sidebar_frame.sliders_frame.play_button.configure(text='Play')
+
+    @staticmethod
+    def get_cine_image(niigrid, config_dict, t):
+        return niigrid.get_image(**{**config_dict, 'origin': list(config_dict['origin'][:3]) + [t]})
+
+    def show_cine_frame(self):
+        frame = self.cine.pop_frame()
+        if frame is not None:
+            t, self.image = frame
+            self.config.origin[3] = t
+            self.sidebar_frame.sliders_frame.sliders['time'].set(t)
+            self.show_image()
+        self.sidebar_frame.sliders_frame.play_button.configure(text=f'Pause ({self.cine.achieved_fps:.1f} fps)')
+        self._cine_timer = self.after(max(1, int(500 / self.cine.fps)), self.show_cine_frame)
 
     def get_image(self, hd=True):
         config_dict = self.config.to_dict(grid_kwargs_only=True)
@@ -683,14 +997,21 @@ class MainFrame(CTkFrame):
             if self.config.n_layers > 1:
                 frame.options_frame.vrange_start_mask_spinbox.set(nimage.cmaps[-1].vrange[0])
                 frame.options_frame.vrange_stop_mask_spinbox.set(nimage.cmaps[-1].vrange[-1])
+        time_slider = self.sidebar_frame.sliders_frame.sliders['time']
+        if time_slider.cget('to') != max(1, self.niigrid.n_frames - 1):
+            time_slider.configure(to=max(1, self.niigrid.n_frames - 1))
         if hasattr(self.sidebar_frame, 'pages_frame'):
             page = min(self.config.page, self.config.n_pages - 1)
             self.sidebar_frame.pages_frame.page_label.configure(text=f'Page {page + 1} of {self.config.n_pages}')
 
     def set_image_overlay(self, event, remove_overlay=False):
         tk_image = ImageTk.PhotoImage(self.image, size=self.image.size)
-        if not remove_overlay and 0 <= event.x < self.image.size[0] and 0 <= event.y < self.image.size[1]:
+        atlas_text = None
+        is_inside = 0 <= event.x < self.image.size[0] and 0 <= event.y < self.image.size[1]
+        if not remove_overlay and self.image_grid_numbers is not None and is_inside:
             box_number = self.image_grid_numbers[event.x, event.y]
+            if 0 <= box_number < len(self.niigrid.niis):
+                atlas_text = self.get_atlas_text(event.x, event.y, box_number)
             if 0 <= box_number < len(self.image_grid_boxes) and len(self.image_grid_boxes) > 1:
                 box = self.image_grid_boxes[box_number]
                 box_frame = Image.fromarray(get_window_frame(size=(box[2] - box[0], box[3] - box[1])))
@@ -701,6 +1022,50 @@ class MainFrame(CTkFrame):
         filterwarnings('ignore', category=UserWarning)
         self.image_label.configure(image=tk_image)
         filterwarnings('default', category=UserWarning)
+        self.set_atlas_label(atlas_text)
+
+    def build_atlases(self):
+        if self.niigrid is not None and self.config.n_layers > 1 and self.config.is_atlas[-1]:
+            with self.niigrid.lock:
+                for nii in self.niigrid.niis:
+                    self.get_atlas(nii)
+
+    def get_atlas(self, nii):
+        nic = nii.nics[-1]
+        key = (nic.filepath, nic.affine.tobytes(), nic.array.shape)
+        if key not in self.atlases and key not in self._atlas_futures:
+            build = lambda array=nic.array, filepath=nic.filepath: Atlas(array[..., 0], load_label_names(filepath))
+            self._atlas_futures.update({key: ATLAS_EXECUTOR.submit(build)})
+        future = self._atlas_futures.get(key)
+        if future is not None and future.done():
+            self._atlas_futures.pop(key)
+            atlas = future.result() if future.exception() is None else None
+            self.atlases.update({key: atlas})
+            if atlas is not None:
+                MEMORY_MANAGER.register((id(self), 'atlases', key), get_nbytes([atlas.labels, atlas.codes]),
+                                        self.get_memory_group(), 'atlases', partial(self.evict_atlas, key))
+        return self.atlases.get(key)
+
+    def get_atlas_text(self, x, y, box_number):
+        if self.config.n_layers > 1 and self.config.is_atlas[-1] and self.cine is None:
+            origin = np.append(self.image_origin_coords[x, y], self.config.origin[3])
+            if np.isnan(origin).any() and self.niigrid.lock.acquire(blocking=False):
+                try:
+                    plane_idx = np.isnan(origin).argmax()
+                    origin[plane_idx] = self.config.origin[plane_idx]
+                    nii = self.niigrid.niis[box_number]
+                    idx = nii.nics[-1].get_array_index(origin, self.config.coord_sys)
+                    atlas = self.get_atlas(nii)
+                    return None if atlas is None else atlas.name_at(idx)
+                finally:
+                    self.niigrid.lock.release()
+
+    def set_atlas_label(self, text=None):
+        if text is None:
+            self.atlas_label.place_forget()
+        else:
+            self.atlas_label.configure(text=f' {text} ')
+            self.atlas_label.place(relx=0, rely=1, x=4, y=-4, anchor='sw')
 
     def get_grid_numbers(self):
         numbers = -np.ones(self.image.size, dtype=np.int16)
@@ -710,7 +1075,8 @@ class MainFrame(CTkFrame):
 
     def update_origin_click(self, event, hd=True, menubar_wait=.5):
         time_since_menubar = time() - self.time_dropdown_clicked
-        if 0 <= event.x < self.image.size[0] and 0 <= event.y < self.image.size[1] and time_since_menubar > menubar_wait:
+        is_inside = 0 <= event.x < self.image.size[0] and 0 <= event.y < self.image.size[1]
+        if self.image_origin_coords is not None and is_inside and time_since_menubar > menubar_wait:
             origin = np.append(self.image_origin_coords[event.x, event.y], self.config.origin[3])
             plane_idx = np.isnan(origin).argmax()
             origin[plane_idx] = self.config.origin[plane_idx]
@@ -736,6 +1102,8 @@ class MainFrame(CTkFrame):
         return coords
 
     def save_image(self, filetype):
+        if self.is_loading:
+            return
         extension = filetype[1].split(';')[0][1:]
         filepath = filedialog.asksaveasfilename(defaultextension=extension, filetypes=[filetype])
         if filepath:
@@ -747,12 +1115,42 @@ class MainFrame(CTkFrame):
                 config_dict.pop('tmp_height')
                 self.niigrid.save_image(filepath, **config_dict)
 
+    def save_poster(self):
+        if self.poster_export is not None or self.is_loading:
+            return
+        filepath = filedialog.asksaveasfilename(defaultextension='.png', filetypes=[FILETYPES[0]])
+        if filepath:
+            dialog = CTkInputDialog(text='Poster height [pixels]', title='Save poster')
+            height = dialog.get_input()
+            if height is not None and height.strip().isdigit() and int(height) > 0:
+                config_dict = deepcopy(self.config.to_dict(grid_kwargs_only=True))
+                config_dict.update({'height': int(height)})
+                self.poster_export = PosterExport(self.niigrid, filepath, config_dict)
+                self.poster_export.start()
+                self.after(100, self.poll_poster_export, self.poster_export)
+
+    def poll_poster_export(self, poster_export):
+        toplevel = self.winfo_toplevel()
+        if poster_export.is_done:
+            self.poster_export = None
+            if poster_export.error is None:
+                toplevel.title('NiftiView')
+            else:
+                toplevel.title(f'NiftiView - Saving poster failed: {poster_export.error}')
+                self.after(5000, toplevel.title, 'NiftiView')
+        else:
+            toplevel.title(f'NiftiView - Saving poster {100 * poster_export.progress:.0f}%')
+            self.after(200, self.poll_poster_export, poster_export)
+
     def save_gif(self):
+        if self.is_loading:
+            return
         filepath = filedialog.asksaveasfilename(defaultextension='.gif',
                                                 filetypes=[('Graphics Interchange Format', '*.gif')])
         if filepath:
             config_dict = self.config.to_dict(grid_kwargs_only=True)
-            save_gif(self.niigrid, filepath, duration=50, loop=0, start=None, stop=None, **config_dict)
+            niigrid = NiftiImageGrid(self.config.get_filepaths()) if self.niigrid.n_frames > 1 else self.niigrid
+            save_gif(niigrid, filepath, duration=50, loop=0, start=None, stop=None, **config_dict)
 
     def save_all_images_or_gifs(self, gif=False):
         dirpath = filedialog.askdirectory()
@@ -807,7 +1205,8 @@ class NiftiView(CTk):
     def set_toplevel_window(self, event):
         if self.toplevel_window is not None:
             self.toplevel_window.destroy()
-        if 0 <= event.x < self.mainframe.image.size[0] and 0 <= event.y < self.mainframe.image.size[1]:
+        is_inside = 0 <= event.x < self.mainframe.image.size[0] and 0 <= event.y < self.mainframe.image.size[1]
+        if self.mainframe.image_grid_numbers is not None and is_inside:
             window_number = self.mainframe.image_grid_numbers[event.x, event.y]
             config = deepcopy(self.mainframe.config)
             fpaths = config.get_filepaths()
@@ -822,6 +1221,7 @@ def add_key_bindings(app):
     app.bind('<S>', lambda e: app.mainframe.set_quantile_range(None, increment=-1, stop=True))
     app.bind('<W>', lambda e: app.mainframe.set_quantile_range(None, increment=1, stop=True))
     app.bind('<Shift-Return>', lambda e: app.mainframe.set_equal_hist())
+    app.bind('<P>', lambda e: app.mainframe.set_cine())
     app.bind('<Escape>', lambda e: app.wm_attributes('-fullscreen', False))
     app.bind('<Configure>', debounce(app, partial(resize_window, app)))
     app.bind('<Shift-space>', lambda e: app.mainframe.update_config('alpha', 0.))
@@ -0,0 +1,103 @@
+import logging
+import numpy as np
+from PIL import Image
+from threading import RLock
+from collections import OrderedDict
+
+from niftiview_app.native import ScaledArray
+from niftiview_app.utils import MEMORY_BUDGET
+EVICTION_PRIORITIES = {'layers': 0, 'frames': 1, 'atlases': 2, 'view': 3}
+logger = logging.getLogger(__name__)
+
+
+class MemoryManager:
+    def __init__(self, budget=MEMORY_BUDGET):
+        self.budget = None if budget is None else int(budget * 2 ** 20)
+        self.entries = OrderedDict()
+        self.lock = RLock()
+
+    @property
+    def nbytes(self):
+        with self.lock:
+            return sum([entry['nbytes'] for entry in self.entries.values()])
+
+    def register(self, key, nbytes, group, kind, evict=None):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries.update({key: {'nbytes': nbytes, 'group': group, 'kind': kind, 'evict': evict}})
+        self.enforce()
+
+    def unregister(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def release(self, owner):
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == owner]:
+                self.entries.pop(key)
+
+    def touch(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+
+    def enforce(self):
+        with self.lock:
+            if self.budget is None:
+                return
+            nbytes = self.nbytes
+            pinned = set()
+            while nbytes > self.budget:
+                candidates = [(EVICTION_PRIORITIES[entry['kind']], i, key) for i, (key, entry) in
+                              enumerate(self.entries.items()) if entry['evict'] is not None and key not in pinned]
+                if not candidates:
+                    break
+                key = min(candidates)[2]
+                entry = self.entries[key]
+                if entry['evict']() is False:
+                    pinned.add(key)
+                    continue
+                self.entries.pop(key, None)
+                nbytes = self.nbytes
+                logger.debug(f'Evicted {entry["kind"]} of {entry["group"]} ({format_nbytes(entry["nbytes"])})')
+
+    def get_usage(self, by='group'):
+        usage = {}
+        with self.lock:
+            for entry in self.entries.values():
+                usage.update({entry[by]: usage.get(entry[by], 0) + entry['nbytes']})
+        return usage
+
+    def get_usage_text(self):
+        budget = '' if self.budget is None else f' of {format_nbytes(self.budget)}'
+        groups = ' · '.join([f'{k}: {format_nbytes(v)}' for k, v in sorted(self.get_usage('group').items())])
+        kinds = ' · '.join([f'{k}: {format_nbytes(v)}' for k, v in sorted(self.get_usage('kind').items())])
+        return f'Memory: {format_nbytes(self.nbytes)}{budget}\n{groups}\n{kinds}'
+
+    def log_usage(self):
+        logger.debug(self.get_usage_text().replace('\n', ' | '))
+
+
+def get_nbytes(obj):
+    if isinstance(obj, np.memmap):
+        return 0
+    if isinstance(obj, (np.ndarray, ScaledArray)):
+        return obj.nbytes
+    if isinstance(obj, Image.Image):
+        return obj.width * obj.height * len(obj.getbands()) * (4 if obj.mode in ('F', 'I') else 1)
+    if isinstance(obj, dict):
+        return sum([get_nbytes(v) for v in obj.values()])
+    if isinstance(obj, (list, tuple)):
+        return sum([get_nbytes(v) for v in obj])
+    return 0
+
+
+def get_nii_nbytes(nii):
+    return get_nbytes([[nic.array, nic.sorted_array, getattr(nic, 'glass_arrays', None)] for nic in nii.nics])
+
+
+def format_nbytes(nbytes):
+    return f'{nbytes / 2 ** 20:.0f} MB' if nbytes < 2 ** 30 else f'{nbytes / 2 ** 30:.1f} GB'
+
+
+MEMORY_MANAGER = MemoryManager()
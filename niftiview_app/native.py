@@ -0,0 +1,110 @@
+import numpy as np
+import nibabel as nib
+from io import BytesIO
+from functools import cached_property
+from nibabel.arrayproxy import ArrayProxy
+from nibabel.orientations import io_orientation, inv_ornt_aff, apply_orientation
+from niftiview.core import load_nib, get_aspect_ratios
+
+from niftiview_app.glass import LazyGlassCore, project
+
+
+class ScaledArray:
+    def __init__(self, raw, lut):
+        self.raw = raw
+        self.lut = lut
+        self.index_dtype = np.dtype(f'u{raw.dtype.itemsize}')
+
+    @property
+    def shape(self):
+        return self.raw.shape
+
+    @property
+    def ndim(self):
+        return self.raw.ndim
+
+    @property
+    def size(self):
+        return self.raw.size
+
+    @property
+    def dtype(self):
+        return self.lut.dtype
+
+    @property
+    def nbytes(self):
+        return self.raw.nbytes
+
+    def __len__(self):
+        return len(self.raw)
+
+    def __getitem__(self, key):
+        return self.lut[self.raw[key].view(self.index_dtype)]
+
+    def __array__(self, dtype=None, copy=None):
+        array = self[...]
+        return array if dtype is None else array.astype(dtype)
+
+    @cached_property
+    def is_monotonic(self):
+        iinfo = np.iinfo(self.raw.dtype)
+        diffs = np.diff(self.lut[np.arange(iinfo.min, iinfo.max + 1, dtype=self.raw.dtype).view(self.index_dtype)])
+        return bool((diffs >= 0).all() or (diffs <= 0).all())
+
+    def project(self, glass_mode, axis, t=0):
+        if not self.is_monotonic:
+            return project(self[..., t], glass_mode, axis)
+        raw = self.raw[..., t]
+        maxima = self.lut[raw.max(axis).view(self.index_dtype)]
+        minima = self.lut[raw.min(axis).view(self.index_dtype)]
+        if glass_mode == 'absmax':
+            return np.maximum(np.abs(maxima), np.abs(minima))
+        return np.maximum(maxima, minima) if glass_mode == 'max' else np.minimum(maxima, minima)
+
+    def __lt__(self, other):
+        return np.asarray(self) < other
+
+    def __gt__(self, other):
+        return np.asarray(self) > other
+
+
+class NativeCore(LazyGlassCore):
+    def __init__(self, nib_image, t=None):
+        dtype = nib_image.get_data_dtype()
+        ornt = io_orientation(nib_image.affine)
+        proxy = nib_image.dataobj
+        raw_proxy = ArrayProxy(proxy.file_like, (proxy.shape, dtype, proxy.offset, 1., 0.), order=proxy.order)
+        raw = np.asanyarray(raw_proxy if t is None else raw_proxy[..., t])
+        raw = apply_orientation(raw.astype(dtype.newbyteorder('='), copy=False), ornt)
+        lut = get_scaling_lut(proxy, is_canonical=t is None and (ornt == io_orientation(np.eye(4))).all())
+        canonical_image = nib.Nifti1Image(raw, get_canonical_affine(nib_image), nib_image.header)
+        self.shape = raw.shape
+        sorted_raw = np.sort(raw.flatten(order='F'))
+        self.sorted_array = ScaledArray(sorted_raw if proxy.slope >= 0 else sorted_raw[::-1], lut)
+        self.array = ScaledArray(raw[..., None] if raw.ndim == 3 else raw, lut)
+        self.affine = canonical_image.affine
+        self.filepath = None
+        self.header = canonical_image.header
+        self.glass_arrays = self.get_glass_arrays(self.array)
+        self.aspect_ratios = get_aspect_ratios(self.affine, self.array.shape)
+        self._image_props = []
+
+
+def is_native(nib_image):
+    dtype = nib_image.get_data_dtype()
+    return nib.is_proxy(nib_image.dataobj) and dtype.kind in 'iu' and dtype.itemsize <= 2
+
+
+def get_canonical_affine(nib_image):
+    return nib_image.affine @ inv_ornt_aff(io_orientation(nib_image.affine), nib_image.shape[:3])
+
+
+def get_scaling_lut(proxy, is_canonical=True):
+    dtype = np.dtype(proxy.dtype)
+    values = np.arange(2 ** (8 * dtype.itemsize), dtype=f'u{dtype.itemsize}').view(dtype.newbyteorder('='))
+    side = 2 ** (4 * dtype.itemsize)
+    lut_proxy = ArrayProxy(BytesIO(values.tobytes()), ((side, side, 1), values.dtype, 0, proxy.slope, proxy.inter))
+    if is_canonical:
+        return load_nib(nib_image=nib.Nifti1Image(lut_proxy, np.eye(4)))[0].ravel(order='F')
+    lut_image = nib.Nifti1Image(np.asanyarray(lut_proxy[...]), np.diag([-1., 1., 1., 1.]))
+    return load_nib(nib_image=lut_image)[0][::-1].ravel(order='F')
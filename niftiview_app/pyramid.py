@@ -0,0 +1,132 @@
+import os
+import numpy as np
+from pathlib import Path
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from niftiview.core import PLANES
+
+from niftiview_app.utils import CACHE_PATH, get_file_key
+PYRAMID_PATH = f'{CACHE_PATH}/pyramids'
+PYRAMID_FACTORS = (2, 4, 8)
+PYRAMID_MIN_VOXELS = 256 ** 3
+PYRAMID_CACHE_SIZE = 4 * 2 ** 30
+PYRAMID_EXECUTOR = ThreadPoolExecutor(max_workers=1)
+
+
+class Pyramid:
+    def __init__(self, array, affine, key=None, nearest=False):
+        self.array = array
+        self.affine = affine
+        self.key = key
+        self.nearest = nearest
+        self.levels = {}
+
+    def build(self):
+        array = self.array
+        for factor in PYRAMID_FACTORS:
+            filepath = None if self.key is None else f'{PYRAMID_PATH}/{self.key}_{factor}.npy'
+            if filepath is not None and Path(filepath).is_file():
+                array = np.load(filepath, mmap_mode='r')
+                os.utime(filepath)
+            else:
+                array = downsample_nearest(self.array, factor) if self.nearest else downsample(array)
+                if filepath is not None:
+                    save_level(array, filepath)
+            offset = factor // 2 if self.nearest else (factor - 1) / 2
+            self.levels.update({factor: (array, downsample_affine(self.affine, factor, offset))})
+        self.array = None
+        if self.key is not None:
+            evict_levels()
+        return self
+
+    def get_factor(self, image_props):
+        factors = [f for f, (array, _) in self.levels.items() if fits_image_props(array.shape, image_props)]
+        return max(factors) if factors else 1
+
+
+def get_level_factor(nics, image_props):
+    if not all([hasattr(nic, 'pyramid') for nic in nics]):
+        return 1
+    return min([nic.pyramid.get_factor(image_props) for nic in nics])
+
+
+def fits_image_props(shape, image_props):
+    for kw in image_props:
+        dims = [dim for dim, plane in enumerate(PLANES) if plane != kw['plane']]
+        if shape[dims[0]] < kw['size'][0] or shape[dims[1]] < kw['size'][1]:
+            return False
+    return True
+
+
+def downsample(array, slab_size=8):
+    shape = [s // 2 for s in array.shape[:3]]
+    downsampled = np.empty((*shape, *array.shape[3:]), dtype=np.float32)
+    for start in range(0, shape[0], slab_size):
+        stop = min(start + slab_size, shape[0])
+        slab = np.asarray(array[2 * start:2 * stop, :2 * shape[1], :2 * shape[2]])
+        slab = slab.reshape(stop - start, 2, shape[1], 2, shape[2], 2, *slab.shape[3:])
+        downsampled[start:stop] = slab.mean(axis=(1, 3, 5), dtype=np.float32)
+    return downsampled
+
+
+def downsample_nearest(array, factor=2):
+    slices = tuple([slice(factor // 2, factor * (s // factor), factor) for s in array.shape[:3]])
+    return np.ascontiguousarray(array[slices])
+
+
+def downsample_affine(affine, factor=2, offset=.5):
+    scaling = np.diag([factor, factor, factor, 1.])
+    scaling[:3, 3] = offset
+    return affine @ scaling
+
+
+def save_level(array, filepath):
+    Path(filepath).parent.mkdir(parents=True, exist_ok=True)
+    np.save(f'{filepath[:-4]}.tmp.npy', array)
+    os.replace(f'{filepath[:-4]}.tmp.npy', filepath)
+
+
+def evict_levels(path=PYRAMID_PATH, max_bytes=PYRAMID_CACHE_SIZE, fraction=.8):
+    filepaths = sorted(Path(path).glob('*.npy'), key=lambda fp: fp.stat().st_mtime)
+    nbytes = sum([fp.stat().st_size for fp in filepaths])
+    if nbytes > max_bytes:
+        for fp in filepaths:
+            if nbytes <= fraction * max_bytes:
+                break
+            size = fp.stat().st_size
+            try:
+                fp.unlink(missing_ok=True)
+            except OSError:
+                continue
+            nbytes -= size
+
+
+def clear_levels(path=PYRAMID_PATH):
+    for fp in Path(path).glob('*.npy'):
+        try:
+            fp.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+
+def build_pyramids(nii, t=0):
+    for i, nic in enumerate(nii.nics):
+        if np.prod(nic.array.shape[:3]) >= PYRAMID_MIN_VOXELS and not hasattr(nic, 'pyramid'):
+            key = None if nic.filepath is None else get_file_key(nic.filepath, t, nic.affine.tolist(), nic.array.shape,
+                                                                 i > 0)
+            future = PYRAMID_EXECUTOR.submit(Pyramid(nic.array, nic.affine, key, nearest=i > 0).build)
+            future.add_done_callback(lambda f, nic=nic: setattr(nic, 'pyramid', f.result()))
+
+
+@contextmanager
+def pyramid_level(nics, factor=1):
+    states = [(nic.array, nic.affine, nic.shape) for nic in nics]
+    try:
+        if factor > 1:
+            for nic in nics:
+                nic.array, nic.affine = nic.pyramid.levels[factor]
+                nic.shape = nic.array.shape[:len(nic.shape)]
+        yield
+    finally:
+        for nic, (array, affine, shape) in zip(nics, states):
+            nic.array, nic.affine, nic.shape = array, affine, shape
@@ -0,0 +1,110 @@
+import numpy as np
+from functools import lru_cache
+RESAMPLE_CACHE_SIZE = 256
+RESAMPLE_BLOCK_SIZE = 32
+HAMMING_COEFFS = (float(np.float32(.54)), float(np.float32(.46)))
+
+
+def box_filter(x):
+    return ((x > -.5) & (x <= .5)).astype(np.float64)
+
+
+def bilinear_filter(x):
+    x = np.abs(x)
+    return np.where(x < 1, 1 - x, 0.)
+
+
+def bicubic_filter(x, a=-.5):
+    x = np.abs(x)
+    return np.where(x < 1, ((a + 2) * x - (a + 3)) * x * x + 1, np.where(x < 2, (((x - 5) * x + 8) * x - 4) * a, 0.))
+
+
+def hamming_filter(x):
+    x = np.abs(x)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        y = np.sin(np.pi * x) / (np.pi * x) * (HAMMING_COEFFS[0] + HAMMING_COEFFS[1] * np.cos(np.pi * x))
+    return np.where(x == 0, 1., np.where(x < 1, y, 0.))
+
+
+def sinc(x):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(x == 0, 1., np.sin(np.pi * x) / (np.pi * x))
+
+
+def lanczos_filter(x):
+    return np.where((x >= -3) & (x < 3), sinc(x) * sinc(x / 3), 0.)
+
+
+FILTERS = {1: (lanczos_filter, 3.), 2: (bilinear_filter, 1.), 3: (bicubic_filter, 2.), 4: (box_filter, .5),
+           5: (hamming_filter, 1.)}
+
+
+@lru_cache(maxsize=RESAMPLE_CACHE_SIZE)
+def get_resize_weights(src_size, dst_size, resizing):
+    kernel, support = FILTERS[resizing]
+    scale = src_size / dst_size
+    filterscale = max(scale, 1.)
+    support = support * filterscale
+    centers = (np.arange(dst_size) + .5) * scale
+    xmins = np.clip((centers - support + .5).astype(np.int64), 0, None)
+    xmaxs = np.clip((centers + support + .5).astype(np.int64), None, src_size) - xmins
+    ksize = int(np.ceil(support)) * 2 + 1
+    xs = np.arange(ksize)
+    weights = kernel((xs + xmins[:, None] - centers[:, None] + .5) / filterscale)
+    weights[xs >= xmaxs[:, None]] = 0
+    sums = weights.sum(axis=1, keepdims=True)
+    weights = np.divide(weights, sums, out=weights, where=sums != 0)
+    blocks = []
+    for d0 in range(0, dst_size, RESAMPLE_BLOCK_SIZE):
+        d1 = min(d0 + RESAMPLE_BLOCK_SIZE, dst_size)
+        s0, s1 = xmins[d0:d1].min(), (xmins + xmaxs)[d0:d1].max()
+        matrix = np.zeros((d1 - d0, s1 - s0))
+        for i in range(d1 - d0):
+            matrix[i, xmins[d0 + i] - s0:xmins[d0 + i] - s0 + xmaxs[d0 + i]] = weights[d0 + i, :xmaxs[d0 + i]]
+        matrix.setflags(write=False)
+        blocks.append((d0, d1, s0, s1, matrix))
+    return tuple(blocks)
+
+
+@lru_cache(maxsize=RESAMPLE_CACHE_SIZE)
+def get_nearest_indices(src_size, dst_size):
+    step = src_size / dst_size
+    positions = np.add.accumulate(np.r_[.5 * step, np.full(dst_size - 1, step)])
+    indices = np.clip(positions.astype(np.int64), 0, src_size - 1)
+    indices.setflags(write=False)
+    return indices
+
+
+def resize_arrays(arrays, size, resizing=1):
+    arrays = np.asarray(arrays, dtype=np.float32)
+    height, width = arrays.shape[-2:]
+    if int(resizing) == 0:
+        arrays = arrays.take(get_nearest_indices(height, size[1]), axis=-2)
+        return arrays.take(get_nearest_indices(width, size[0]), axis=-1)
+    if width != size[0]:
+        result = np.empty((*arrays.shape[:-1], size[0]), dtype=np.float32)
+        for d0, d1, s0, s1, matrix in get_resize_weights(width, size[0], int(resizing)):
+            result[..., d0:d1] = arrays[..., s0:s1] @ matrix.T
+        arrays = result
+    if height != size[1]:
+        result = np.empty((*arrays.shape[:-2], size[1], arrays.shape[-1]), dtype=np.float32)
+        for d0, d1, s0, s1, matrix in get_resize_weights(height, size[1], int(resizing)):
+            result[..., d0:d1, :] = matrix @ arrays[..., s0:s1, :]
+        arrays = result
+    return arrays
+
+
+def get_core_images(nics, origins, layout, height, aspect_ratios, coord_sys, resize_modes, glass_mode=None):
+    images, groups = [], {}
+    for j, (nic, origin) in enumerate(zip(nics, origins)):
+        nic._set_image_properties(origin, layout, height, aspect_ratios, coord_sys)
+        images.append(np.zeros(nic.image_size[::-1], dtype=np.float32))
+        for kw in nic._image_props:
+            array = np.rot90(nic.get_array_slice(kw['plane'], kw['idx'], glass_mode))
+            groups.setdefault((array.shape, kw['size'], resize_modes[j]), []).append((j, kw['box'], array))
+    for (shape, size, resize_mode), items in groups.items():
+        arrays = np.stack([array for _, _, array in items])
+        arrays = arrays.astype(np.float32) if shape[::-1] == size else resize_arrays(arrays, size, resize_mode)
+        for (j, box, _), array in zip(items, arrays):
+            images[j][box[1]:box[1] + size[1], box[0]:box[0] + size[0]] = array
+    return images
@@ -0,0 +1,106 @@
+import os
+import json
+import hashlib
+import numpy as np
+from pathlib import Path
+from PIL import Image
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+from niftiview.grid import optimal_shape, get_grid_boxes, compose_image
+
+from niftiview_app.utils import CACHE_PATH, get_file_key
+TILE_PATH = f'{CACHE_PATH}/tiles'
+TILE_CACHE_SIZE = 512 * 2 ** 20
+TILE_EXECUTOR = ThreadPoolExecutor(max_workers=1)
+
+
+class TileCache:
+    def __init__(self, path=TILE_PATH, max_bytes=TILE_CACHE_SIZE):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.lock = Lock()
+        self._nbytes = None
+
+    @property
+    def nbytes(self):
+        if self._nbytes is None:
+            self._nbytes = sum([fp.stat().st_size for fp in self.path.glob('*.png')])
+        return self._nbytes
+
+    def get_keys(self, filepaths, config_dict):
+        render_dict = {k: v for k, v in config_dict.items() if k != 'tmp_height'}
+        render_dict.update({'nrows': get_grid_shape(len(filepaths), render_dict['layout'], render_dict['nrows'])})
+        title = render_dict['title']
+        titles = title if isinstance(title, list) else len(filepaths) * [title]
+        try:
+            file_keys = ['|'.join([get_file_key(fp) for fp in fpaths]) for fpaths in filepaths]
+        except OSError:
+            return None
+        if render_dict['squeeze']:
+            render_dict.update({'squeeze': file_keys})
+        keys = []
+        for file_key, title in zip(file_keys, titles):
+            render_str = json.dumps({**render_dict, 'title': title}, sort_keys=True, default=str)
+            keys.append(hashlib.sha1(f'{file_key}|{render_str}'.encode()).hexdigest())
+        return keys
+
+    def get(self, key):
+        filepath = self.path / f'{key}.png'
+        try:
+            with Image.open(filepath) as im:
+                im.load()
+            os.utime(filepath)
+            return im
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, image):
+        filepath = self.path / f'{key}.png'
+        if filepath.is_file():
+            os.utime(filepath)
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        image.save(self.path / f'{key}.tmp.png')
+        os.replace(self.path / f'{key}.tmp.png', filepath)
+        with self.lock:
+            self._nbytes = None if self._nbytes is None else self._nbytes + filepath.stat().st_size
+            if self.nbytes > self.max_bytes:
+                self.evict()
+
+    def put_async(self, keys, images):
+        for key, image in zip(keys, images):
+            TILE_EXECUTOR.submit(self.put, key, image.copy())
+
+    def evict(self, fraction=.8):
+        filepaths = sorted(self.path.glob('*.png'), key=lambda fp: fp.stat().st_mtime)
+        for fp in filepaths:
+            if self._nbytes <= fraction * self.max_bytes:
+                break
+            self._nbytes -= fp.stat().st_size
+            fp.unlink(missing_ok=True)
+
+    def clear(self):
+        with self.lock:
+            for fp in self.path.glob('*.png'):
+                fp.unlink(missing_ok=True)
+            self._nbytes = 0
+
+    def get_image(self, filepaths, config_dict):
+        keys = self.get_keys(filepaths, config_dict)
+        if keys is None:
+            return None
+        tiles = []
+        for key in keys:
+            tile = self.get(key)
+            if tile is None:
+                return None
+            tiles.append(tile)
+        if len(tiles) == 1:
+            return tiles[0]
+        shape = get_grid_shape(len(tiles), config_dict['layout'], config_dict['nrows'])
+        boxes = get_grid_boxes([tile.size for tile in tiles], ncols=shape[1])
+        return compose_image(tiles, boxes, config_dict['cbar_pad_color'])
+
+
+def get_grid_shape(n, layout, nrows=None):
+    return optimal_shape(n, layout) if nrows is None else (nrows, int(np.ceil(n / nrows)))
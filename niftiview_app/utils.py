@@ -1,5 +1,6 @@
 import re
 import glob
+import hashlib
 import warnings
 import dcm2niix
 import numpy as np
@@ -8,7 +9,9 @@ from pathlib import Path
 from customtkinter import CTkEntry, CTkFrame, CTkButton
 from niftiview.utils import load_json, save_json
 DATA_PATH = str(importlib.resources.files('niftiview_app')) + '/data'
+CACHE_PATH = str(Path.home() / '.cache' / 'niftiview_app')
 CONFIG_DICT = load_json(f'{DATA_PATH}/config.json')
+MEMORY_BUDGET = CONFIG_DICT.pop('memory_budget', None)
 LAYER_ATTRIBUTES = ('resizing', 'cmap', 'transp_if', 'qrange', 'vrange', 'is_atlas')
 SAVE_RESET_ATTRIBUTES = ('filepaths_view1', 'filepaths_view2', 'origin', 'resizing', 'cmap',
                          'transp_if', 'qrange', 'vrange', 'is_atlas', 'annotation_dict')
@@ -30,6 +33,12 @@ def parse_dnd_filepaths(filepaths):
     return [fp.strip('{}') for fp in re.findall(r'{[^}]*}|\S+', filepaths)]
 
 
+def get_file_key(filepath, *extras):
+    stat = Path(filepath).stat()
+    key = '|'.join([str(Path(filepath).resolve()), str(stat.st_size), str(stat.st_mtime_ns)] + [str(e) for e in extras])
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
 def get_window_frame(size, exp=12):
     x, y = np.meshgrid(np.linspace(-1, 1, size[0]), np.linspace(-1, 1, size[1]), indexing='xy', copy=False)
     frame = (x ** exp + y ** exp) / 2
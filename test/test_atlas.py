@@ -0,0 +1,25 @@
+import unittest
+import numpy as np
+
+from niftiview_app.atlas import Atlas, parse_label_names
+
+
+class TestAtlas(unittest.TestCase):
+    def test_label_lookup(self):
+        array = np.zeros((4, 5, 6), dtype=np.float32)
+        array[1:3, 1:4, 2:5] = 7
+        array[0, 0, 0] = 1000
+        atlas = Atlas(array, names={7: 'Hippocampus'})
+        self.assertEqual(atlas.labels.tolist(), [0, 7, 1000])
+        self.assertEqual(atlas.label_at((1, 2, 3)), 7)
+        self.assertEqual(atlas.name_at((1, 2, 3, 0)), 'Hippocampus')
+        self.assertEqual(atlas.name_at((0, 0, 0)), 'Label 1000')
+        self.assertIsNone(atlas.name_at((3, 4, 5)))
+
+    def test_parse_label_names(self):
+        text = 'Atlas description\n1 Precentral_L 2001\n2\tFrontal_Sup_R\n3,"Left Amygdala",12,3'
+        self.assertEqual(parse_label_names(text), {1: 'Precentral_L', 2: 'Frontal_Sup_R', 3: 'Left Amygdala'})
+
+
+if __name__ == "__main__":
+    unittest.main()
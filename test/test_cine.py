@@ -0,0 +1,62 @@
+import unittest
+from time import sleep
+from unittest.mock import patch
+
+from niftiview_app.cine import CinePlayer
+
+
+class TestCinePlayer(unittest.TestCase):
+    def test_pop_frame(self):
+        cine = CinePlayer(lambda t: f'frame {t}', n_frames=10, fps=10, buffer_size=4)
+        cine._start_time = 0.
+        with patch('niftiview_app.cine.time', return_value=.05):
+            self.assertIsNone(cine.pop_frame())
+            cine.buffer.update({t: f'frame {t}' for t in [0, 1, 2, 3, 9]})
+            self.assertEqual(cine.pop_frame(), (0, 'frame 0'))
+            self.assertIsNone(cine.pop_frame())
+        with patch('niftiview_app.cine.time', return_value=.35):
+            self.assertEqual(cine.pop_frame(), (3, 'frame 3'))
+            self.assertEqual(list(cine.buffer), [])
+        self.assertEqual(cine.n_dropped, 2)
+        self.assertAlmostEqual(cine.achieved_fps, 1 / .3)
+        self.assertEqual(cine.upcoming_frames(8), [8, 9, 0, 1])
+
+    def test_set_fps(self):
+        cine = CinePlayer(lambda t: t, n_frames=10, start=5, fps=10)
+        cine._start_time = 0.
+        with patch('niftiview_app.cine.time', return_value=.25):
+            cine.set_fps(20)
+            self.assertEqual(cine.target_frame, 7)
+        with patch('niftiview_app.cine.time', return_value=.5):
+            self.assertEqual(cine.target_frame, 2)
+
+    def test_prefetch(self):
+        rendered = []
+        cine = CinePlayer(lambda t: rendered.append(t) or t, n_frames=20, fps=10, buffer_size=4)
+        with patch('niftiview_app.cine.time', return_value=0.):
+            cine.start_playback()
+            for _ in range(100):
+                if len(cine.buffer) == 3:
+                    break
+                sleep(.01)
+            cine.stop_playback()
+        self.assertEqual(rendered, [1, 2, 3])
+        self.assertFalse(cine.is_running)
+        self.assertEqual(len(cine.buffer), 0)
+
+    def test_slow_render(self):
+        cine = CinePlayer(lambda t: sleep(.15) or t, n_frames=50, fps=20, buffer_size=2)
+        cine.start_playback()
+        frames = []
+        for _ in range(120):
+            frame = cine.pop_frame()
+            if frame is not None:
+                frames.append(frame[0])
+            sleep(.01)
+        cine.stop_playback()
+        self.assertGreaterEqual(len(frames), 3)
+        self.assertGreater(cine.n_dropped, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
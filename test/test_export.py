@@ -0,0 +1,52 @@
+import unittest
+import numpy as np
+import nibabel as nib
+from PIL import Image
+from pathlib import Path
+from unittest.mock import patch
+from tempfile import TemporaryDirectory
+
+from niftiview_app import export
+from niftiview_app.export import PngWriter, PosterExport
+from niftiview_app.grid import ImageGrid
+
+
+class TestPngWriter(unittest.TestCase):
+    def test_streamed_rows(self):
+        with TemporaryDirectory() as tmpdir:
+            for mode in ['L', 'RGB', 'RGBA']:
+                array = np.random.default_rng(0).integers(0, 256, size=(50, 37, len(mode)), dtype=np.uint8)
+                with open(f'{tmpdir}/image.png', 'wb') as f:
+                    writer = PngWriter(f, 37, 50, mode)
+                    for y in range(0, 50, 16):
+                        writer.write_rows(array[y:y + 16])
+                    writer.close()
+                with Image.open(f'{tmpdir}/image.png') as im:
+                    self.assertEqual(im.mode, mode)
+                    self.assertTrue(np.array_equal(np.asarray(im).reshape(array.shape), array))
+
+
+class TestPosterExport(unittest.TestCase):
+    def test_matches_grid_image(self):
+        with TemporaryDirectory() as tmpdir:
+            rng = np.random.default_rng(0)
+            filepaths = []
+            for i in range(3):
+                nib.save(nib.Nifti1Image(rng.normal(size=(12, 14, 10)).astype(np.float32), np.eye(4)),
+                         f'{tmpdir}/{i}.nii')
+                filepaths.append(f'{tmpdir}/{i}.nii')
+            niigrid = ImageGrid(filepaths)
+            config_dict = {'origin': [0, 0, 0, 0], 'layout': 'all', 'height': 300, 'nrows': None, 'crosshair': True,
+                           'cbar': True, 'cbar_pad_color': 'black'}
+            PosterExport(niigrid, f'{tmpdir}/poster.png', config_dict).run()
+            with Image.open(f'{tmpdir}/poster.png') as im:
+                self.assertTrue(np.array_equal(np.asarray(im), np.asarray(niigrid.get_image(**config_dict))))
+            with patch.object(export, 'EXPORT_MAX_PATCH_PIXELS', 100):
+                poster_export = PosterExport(niigrid, f'{tmpdir}/large.png', config_dict)
+                poster_export.run()
+            self.assertIsInstance(poster_export.error, ValueError)
+            self.assertFalse(Path(f'{tmpdir}/large.png').exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+import numpy as np
+import nibabel as nib
+from tempfile import TemporaryDirectory
+from niftiview.core import NiftiCore, PLANES, GLASS_MODES
+
+from niftiview_app.glass import LazyGlassCore
+from niftiview_app.native import NativeCore
+
+
+class TestGlassArrays(unittest.TestCase):
+    def test_lazy_projections(self):
+        affine = np.diag([-2., 2., 2., 1.])
+        array = np.random.default_rng(0).integers(-300, 300, size=(6, 7, 8)).astype(np.int16)
+        with TemporaryDirectory() as tmpdir:
+            for slope, inter in [(.37, -12.3), (-1.7, 5.)]:
+                nib_image = nib.Nifti1Image(array, affine)
+                nib_image.header.set_slope_inter(slope, inter)
+                nib.save(nib_image, f'{tmpdir}/image.nii')
+                nib_image = nib.load(f'{tmpdir}/image.nii')
+                nic = NiftiCore(nib_image=nib_image)
+                for lazy_nic in [LazyGlassCore(nib_image=nib_image), NativeCore(nib_image)]:
+                    self.assertEqual(len(lazy_nic.glass_arrays), 0)
+                    for glass_mode in GLASS_MODES:
+                        for plane in PLANES:
+                            self.assertTrue(np.array_equal(nic.glass_arrays[glass_mode][plane],
+                                                           lazy_nic.glass_arrays[glass_mode][plane]))
+
+
+if __name__ == "__main__":
+    unittest.main()
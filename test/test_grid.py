@@ -0,0 +1,72 @@
+import unittest
+import numpy as np
+import nibabel as nib
+from unittest.mock import patch
+from tempfile import TemporaryDirectory
+from niftiview.grid import NiftiImageGrid
+
+from niftiview_app import gzindex
+from niftiview_app.grid import ImageGrid
+
+
+class TestImageGrid(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = TemporaryDirectory()
+        self.gzip_index_path = patch.object(gzindex, 'GZIP_INDEX_PATH', f'{self.tmpdir.name}/gzip_index')
+        self.gzip_index_path.start()
+        rng = np.random.default_rng(0)
+        affine = np.diag([2., 2., 2.5, 1.])
+        self.filepaths = []
+        for i in range(2):
+            nib.save(nib.Nifti1Image(rng.normal(100, 30, (20, 24, 18)).astype(np.float32), affine),
+                     f'{self.tmpdir.name}/image{i}.nii.gz')
+            nib.save(nib.Nifti1Image(rng.integers(0, 4, (20, 24, 18)).astype(np.int16), affine),
+                     f'{self.tmpdir.name}/mask{i}.nii.gz')
+            self.filepaths.append([f'{self.tmpdir.name}/image{i}.nii.gz', f'{self.tmpdir.name}/mask{i}.nii.gz'])
+        array = rng.normal(100, 30, (20, 24, 18, 5)) * np.arange(1, 6)
+        nib_image = nib.Nifti1Image(array.astype(np.int16), affine)
+        nib_image.header.set_slope_inter(.5, 3)
+        nib.save(nib_image, f'{self.tmpdir.name}/image4d.nii.gz')
+
+    def tearDown(self):
+        gzindex.GZIP_INDEX_EXECUTOR.submit(lambda: None).result()
+        self.gzip_index_path.stop()
+        self.tmpdir.cleanup()
+
+    def assertImagesEqual(self, image, expected_image):
+        self.assertEqual(image.size, expected_image.size)
+        self.assertTrue(np.array_equal(np.asarray(image), np.asarray(expected_image)))
+
+    def test_matches_niftiimagegrid(self):
+        kwargs = {'origin': [0, 0, 0, 0], 'height': 200, 'crosshair': True, 'cbar': True}
+        self.assertImagesEqual(ImageGrid(self.filepaths).get_image(**kwargs),
+                               NiftiImageGrid(self.filepaths).get_image(**kwargs))
+
+    def test_cached_layers_match_niftiimagegrid(self):
+        niigrid, expected_niigrid = ImageGrid(self.filepaths), NiftiImageGrid(self.filepaths)
+        kwargs = {'origin': [0, 0, 0, 0], 'height': 200, 'crosshair': True, 'coordinates': True, 'cbar': True}
+        for update in [{}, {'origin': [4, -6, 2, 0]}, {'alpha': .2}, {'glass_mode': 'max'},
+                       {'origin': [8, 6, -4, 0]}, {'glass_mode': None}, {'tmp_height': 100}, {'alpha': .8},
+                       {'tmp_height': None}, {'cbar_vertical': False, 'cbar_pad': 30}, {'linewidth': 4},
+                       {'header': True, 'title': 'Title'}, {'cmap': ['hot', 'jet']}]:
+            kwargs.update(update)
+            self.assertImagesEqual(niigrid.get_image(**kwargs), expected_niigrid.get_image(**kwargs))
+
+    def test_4d_header_matches_niftiimagegrid(self):
+        filepath = f'{self.tmpdir.name}/image4d.nii.gz'
+        kwargs = {'origin': [0, 0, 0, 2], 'height': 200, 'header': True, 'vrange': [0, 500]}
+        for native in [True, False]:
+            self.assertImagesEqual(ImageGrid(filepath, native=native).get_image(**kwargs),
+                                   NiftiImageGrid(filepath).get_image(**kwargs))
+
+    def test_pinned_value_range(self):
+        niigrid = ImageGrid(f'{self.tmpdir.name}/image4d.nii.gz')
+        niigrid.get_image(origin=[0, 0, 0, 0])
+        value_range = list(niigrid.niis[0].cmaps[0].vrange)
+        for t in range(1, 5):
+            niigrid.get_image(origin=[0, 0, 0, t])
+            self.assertEqual(list(niigrid.niis[0].cmaps[0].vrange), value_range)
+
+
+if __name__ == "__main__":
+    unittest.main()
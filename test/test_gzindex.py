@@ -0,0 +1,57 @@
+import unittest
+import numpy as np
+import nibabel as nib
+from pathlib import Path
+from unittest.mock import patch
+from tempfile import TemporaryDirectory
+
+from niftiview_app import gzindex
+from niftiview_app.gzindex import GZIP_BUFFER_SIZE, GZIP_INDEX_EXECUTOR, load_nifti, get_index_filepath
+
+
+class TestLoadNifti(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = TemporaryDirectory()
+        self.array = np.random.default_rng(0).integers(0, 1000, (10, 11, 12, 3)).astype(np.int16)
+        self.filepath = f'{self.tmpdir.name}/image.nii.gz'
+        nib.save(nib.Nifti1Image(self.array, np.eye(4)), self.filepath)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_fallback_without_indexed_gzip(self):
+        with patch.object(gzindex, 'IndexedGzipFile', None), \
+                patch.object(gzindex, 'GZIP_INDEX_PATH', f'{self.tmpdir.name}/gzip_index'):
+            nib_image = load_nifti(self.filepath)
+        self.assertTrue(np.array_equal(np.asanyarray(nib_image.dataobj[..., 1]), self.array[..., 1]))
+        self.assertFalse(Path(f'{self.tmpdir.name}/gzip_index').exists())
+
+    @unittest.skipIf(gzindex.IndexedGzipFile is None, 'indexed_gzip is not installed')
+    def test_indexed_reads(self):
+        with patch.object(gzindex, 'IndexedGzipFile', wraps=gzindex.IndexedGzipFile) as indexed_gzip_file, \
+                patch.object(gzindex, 'GZIP_INDEX_PATH', f'{self.tmpdir.name}/gzip_index'):
+            index_filepath = get_index_filepath(self.filepath)
+            nib_image = load_nifti(self.filepath)
+            self.assertTrue(np.array_equal(np.asanyarray(nib_image.dataobj), self.array))
+            GZIP_INDEX_EXECUTOR.submit(lambda: None).result()
+            self.assertTrue(Path(index_filepath).is_file())
+            nib_image = load_nifti(self.filepath)
+            self.assertEqual(indexed_gzip_file.call_args.kwargs['buffer_size'], GZIP_BUFFER_SIZE)
+            self.assertTrue(np.array_equal(np.asanyarray(nib_image.dataobj[..., 2]), self.array[..., 2]))
+            Path(index_filepath).write_bytes(b'corrupt')
+            nib_image = load_nifti(self.filepath)
+            self.assertTrue(np.array_equal(np.asanyarray(nib_image.dataobj[..., 0]), self.array[..., 0]))
+
+    @unittest.skipIf(gzindex.IndexedGzipFile is None, 'indexed_gzip is not installed')
+    def test_no_index_for_3d(self):
+        filepath = f'{self.tmpdir.name}/image3d.nii.gz'
+        nib.save(nib.Nifti1Image(self.array[..., 0], np.eye(4)), filepath)
+        with patch.object(gzindex, 'GZIP_INDEX_PATH', f'{self.tmpdir.name}/gzip_index'):
+            nib_image = load_nifti(filepath)
+            GZIP_INDEX_EXECUTOR.submit(lambda: None).result()
+        self.assertTrue(np.array_equal(np.asanyarray(nib_image.dataobj), self.array[..., 0]))
+        self.assertFalse(Path(f'{self.tmpdir.name}/gzip_index').exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
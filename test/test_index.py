@@ -0,0 +1,55 @@
+import os
+import unittest
+import numpy as np
+import nibabel as nib
+from tempfile import TemporaryDirectory
+
+from niftiview_app.index import FileIndex, Indexer, iglob_sorted
+
+
+class TestIndex(unittest.TestCase):
+    def test_iglob_sorted(self):
+        with TemporaryDirectory() as tmpdir:
+            for subject in ['sub-10', 'sub-02', '.hidden']:
+                os.makedirs(f'{tmpdir}/{subject}/anat')
+                for name in ['T1w.nii.gz', 'T2w.nii.gz', 'notes.txt']:
+                    open(f'{tmpdir}/{subject}/anat/{name}', 'w').close()
+            filepaths = list(iglob_sorted(f'{tmpdir}/*/anat/*.nii.gz'))
+            self.assertEqual(filepaths, [f'{tmpdir}/{s}/anat/{n}' for s in ['sub-02', 'sub-10']
+                                         for n in ['T1w.nii.gz', 'T2w.nii.gz']])
+            self.assertEqual(list(iglob_sorted(f'{tmpdir}/sub-02/anat/notes.txt')), [f'{tmpdir}/sub-02/anat/notes.txt'])
+            self.assertEqual(list(iglob_sorted(f'{tmpdir}/missing.nii')), [])
+
+    def test_indexer(self):
+        with TemporaryDirectory() as tmpdir:
+            for i in range(5):
+                nib.save(nib.Nifti1Image(np.zeros((4, 5, 6) if i != 3 else (4, 5), dtype=np.int16), np.eye(4)),
+                         f'{tmpdir}/{i}.nii')
+            with open(f'{tmpdir}/5.nii', 'w') as f:
+                f.write('not a nifti')
+            index = FileIndex(':memory:')
+            indexer = Indexer(index, f'{tmpdir}/*.nii', batch_size=2)
+            indexer.run()
+            expected_filepaths = [f'{tmpdir}/{i}.nii' for i in (0, 1, 2, 4)]
+            self.assertTrue(indexer.is_done)
+            self.assertEqual(indexer.get_batches(), [expected_filepaths[:2], expected_filepaths[2:]])
+            self.assertEqual(index.get_glob(f'{tmpdir}/*.nii'), expected_filepaths)
+            header = index.get(f'{tmpdir}/0.nii')
+            self.assertEqual((header['shape'], header['dtype']), ([4, 5, 6], 'int16'))
+            nib.save(nib.Nifti1Image(np.zeros((4, 5, 6, 2), dtype=np.float32), np.eye(4)), f'{tmpdir}/0.nii')
+            os.utime(f'{tmpdir}/0.nii', ns=(0, 0))
+            self.assertEqual(index.get(f'{tmpdir}/0.nii')['shape'], [4, 5, 6, 2])
+            self.assertIsNone(index.get(f'{tmpdir}/missing.nii'))
+
+    def test_indexer_failure(self):
+        index = FileIndex(':memory:')
+        index.get = lambda filepath: 1 / 0
+        indexer = Indexer(index, ['0.nii', '1.nii'], view=2, cached_filepaths=['0.nii'])
+        self.assertEqual((indexer.view, indexer.n_added), (2, 1))
+        with self.assertRaises(ZeroDivisionError):
+            indexer.run()
+        self.assertTrue(indexer.is_done)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+from tempfile import TemporaryDirectory
+
+from niftiview_app import journal
+from niftiview_app.journal import AnnotationJournal, get_first_unannotated_index
+
+
+class TestAnnotationJournal(unittest.TestCase):
+    def test_resume_after_crash(self):
+        with TemporaryDirectory() as tmpdir:
+            filepath = f'{tmpdir}/annotations.csv'
+            annotation_journal = AnnotationJournal(filepath)
+            annotation_journal.append('a.nii', 1)
+            annotation_journal.append('b.nii', 2)
+            annotation_journal.append('a.nii', 0)
+            annotation_journal.close()
+            with open(filepath, 'a') as file:
+                file.write('c.nii,')
+            annotation_journal = AnnotationJournal(filepath)
+            self.assertEqual(annotation_journal.load(), {'a.nii': 0, 'b.nii': 2})
+            annotation_journal.append('d.nii', 1)
+            annotation_journal.close()
+            self.assertEqual(AnnotationJournal(filepath).load(), {'a.nii': 0, 'b.nii': 2, 'd.nii': 1})
+            self.assertEqual(get_first_unannotated_index(['a.nii', 'b.nii', 'c.nii'], {'a.nii': 0, 'b.nii': 2}), 2)
+
+    def test_compaction(self):
+        with TemporaryDirectory() as tmpdir:
+            filepath = f'{tmpdir}/annotations.csv'
+            annotation_journal = AnnotationJournal(filepath)
+            for i in range(2 * journal.JOURNAL_MIN_LINES):
+                annotation_journal.append(f'{i % 3}.nii', i % 3)
+            annotation_journal.close()
+            with open(filepath) as file:
+                self.assertLess(len(file.readlines()), 2 * journal.JOURNAL_MIN_LINES)
+            self.assertEqual(AnnotationJournal(filepath).load(), {'0.nii': 0, '1.nii': 1, '2.nii': 2})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+
+from niftiview_app.memory import MemoryManager
+
+
+class TestMemoryManager(unittest.TestCase):
+    def test_enforce(self):
+        memory = MemoryManager(budget=10 / 2 ** 20)
+        evicted = []
+        evict = lambda key, pinned=False: evicted.append(key) if not pinned else False
+        memory.register('display', 4, 'View 1', 'display')
+        memory.register('view', 1, 'View 2', 'view', lambda: evict('view'))
+        memory.register('atlas', 1, 'View 1', 'atlases', lambda: evict('atlas'))
+        memory.register('frame0', 1, 'View 1', 'frames', lambda: evict('frame0'))
+        memory.register('frame1', 1, 'View 1', 'frames', lambda: evict('frame1', pinned=True))
+        memory.register('frame2', 1, 'View 1', 'frames', lambda: evict('frame2'))
+        memory.register('layers', 1, 'View 1', 'layers', lambda: evict('layers'))
+        self.assertEqual(evicted, [])
+        self.assertEqual(memory.nbytes, 10)
+        memory.touch('frame0')
+        memory.register('lookup', 5, 'View 1', 'lookup')
+        self.assertEqual(evicted, ['layers', 'frame2', 'frame0', 'atlas', 'view'])
+        self.assertEqual(list(memory.entries), ['display', 'frame1', 'lookup'])
+        self.assertEqual(memory.get_usage('kind'), {'display': 4, 'frames': 1, 'lookup': 5})
+
+
+if __name__ == "__main__":
+    unittest.main()
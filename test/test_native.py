@@ -0,0 +1,31 @@
+import unittest
+import numpy as np
+import nibabel as nib
+from tempfile import TemporaryDirectory
+from niftiview.core import NiftiCore
+
+from niftiview_app.native import NativeCore
+
+
+class TestNativeCore(unittest.TestCase):
+    def test_scaled_values(self):
+        affine = np.array([[0, 0, 2., 1], [-2., 0, 0, 2], [0, -2., 0, 3], [0, 0, 0, 1]])
+        array = np.random.default_rng(0).integers(-2 ** 15, 2 ** 15, size=(6, 7, 8, 2)).astype(np.int16)
+        with TemporaryDirectory() as tmpdir:
+            for slope, inter in [(.37, -12.3), (-1.7, 5.)]:
+                nib_image = nib.Nifti1Image(array, affine)
+                nib_image.header.set_slope_inter(slope, inter)
+                nib.save(nib_image, f'{tmpdir}/image.nii.gz')
+                nib_image = nib.load(f'{tmpdir}/image.nii.gz')
+                nic = NiftiCore(nib_image=nib.Nifti1Image(np.asanyarray(nib_image.dataobj[..., 1]), affine))
+                native_nic = NativeCore(nib_image, t=1)
+                self.assertEqual(native_nic.array.raw.dtype, np.int16)
+                self.assertTrue(np.array_equal(nic.array, np.asarray(native_nic.array)))
+                self.assertTrue(np.array_equal(nic.array[2, :, 3], native_nic.array[2, :, 3]))
+                self.assertTrue(np.array_equal(nic.affine, native_nic.affine))
+                self.assertTrue(np.array_equal(nic.quantile([0, .3, 1]), native_nic.quantile([0, .3, 1])))
+                self.assertEqual(nic.quantile_of_value(1.5), native_nic.quantile_of_value(1.5))
+
+
+if __name__ == "__main__":
+    unittest.main()
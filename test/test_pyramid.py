@@ -0,0 +1,38 @@
+import os
+import unittest
+import numpy as np
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from niftiview_app.pyramid import Pyramid, evict_levels
+
+
+class TestPyramid(unittest.TestCase):
+    def test_levels(self):
+        affine = np.diag([2., 3., 4., 1.])
+        affine[:3, 3] = [-10., 5., 7.]
+        array = np.arange(35 * 20 * 17, dtype=np.float32).reshape(35, 20, 17, 1)
+        image, mask = Pyramid(array, affine).build(), Pyramid(array, affine, nearest=True).build()
+        for factor in (2, 4, 8):
+            image_level, image_affine = image.levels[factor]
+            mask_level, mask_affine = mask.levels[factor]
+            self.assertEqual(image_level.shape, mask_level.shape)
+            self.assertEqual(image_level.shape, (35 // factor, 20 // factor, 17 // factor, 1))
+            source_idx = np.linalg.solve(affine, mask_affine @ [1, 1, 1, 1])[:3]
+            self.assertEqual(mask_level[1, 1, 1, 0], array[tuple(source_idx.astype(int))][0])
+            source_idx = np.linalg.solve(affine, image_affine @ [1, 1, 1, 1])[:3]
+            self.assertTrue(np.allclose(source_idx, factor * 1 + (factor - 1) / 2))
+            self.assertAlmostEqual(float(image_level[1, 1, 1, 0]), source_idx @ [20 * 17, 17, 1], places=3)
+
+    def test_evict_levels(self):
+        with TemporaryDirectory() as tmpdir:
+            for i in range(10):
+                np.save(f'{tmpdir}/{i}.npy', np.zeros(1000, dtype=np.uint8))
+                os.utime(f'{tmpdir}/{i}.npy', (i, i))
+            nbytes = Path(f'{tmpdir}/0.npy').stat().st_size
+            evict_levels(tmpdir, max_bytes=5 * nbytes)
+            self.assertEqual(sorted([int(fp.stem) for fp in Path(tmpdir).glob('*.npy')]), [6, 7, 8, 9])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,21 @@
+import unittest
+import numpy as np
+from PIL import Image
+
+from niftiview_app.resample import resize_arrays
+
+
+class TestResizeArrays(unittest.TestCase):
+    def test_matches_pil(self):
+        arrays = (np.random.default_rng(0).random((2, 37, 29)) * 1000).astype(np.float32)
+        for size in [(1, 1), (13, 50), (29, 111), (200, 37), (301, 257)]:
+            for resizing in range(6):
+                resized = resize_arrays(arrays, size, resizing)
+                for array, resized_array in zip(arrays, resized):
+                    pil_array = np.asarray(Image.fromarray(array).resize(size, resizing))
+                    self.assertEqual(resized_array.shape, pil_array.shape)
+                    self.assertTrue(np.allclose(resized_array, pil_array, rtol=1e-6, atol=1e-4))
+
+
+if __name__ == "__main__":
+    unittest.main()
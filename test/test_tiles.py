@@ -0,0 +1,53 @@
+import os
+import unittest
+import numpy as np
+from PIL import Image
+from tempfile import TemporaryDirectory
+
+from niftiview_app.tiles import TileCache
+
+CONFIG_DICT = {'layout': 'all', 'nrows': None, 'title': None, 'squeeze': False, 'cmap': ['gray'], 'tmp_height': 300,
+               'cbar_pad_color': 'black'}
+
+
+class TestTileCache(unittest.TestCase):
+    def test_get_keys(self):
+        with TemporaryDirectory() as tmpdir:
+            filepaths = []
+            for i in range(3):
+                with open(f'{tmpdir}/{i}.nii', 'wb') as f:
+                    f.write(bytes(i + 1))
+                filepaths.append([f'{tmpdir}/{i}.nii'])
+            cache = TileCache(f'{tmpdir}/tiles')
+            keys = cache.get_keys(filepaths, CONFIG_DICT)
+            self.assertEqual(len(set(keys)), 3)
+            self.assertEqual(cache.get_keys(filepaths, {**CONFIG_DICT, 'tmp_height': None}), keys)
+            self.assertNotEqual(cache.get_keys(filepaths, {**CONFIG_DICT, 'cmap': ['hot']})[0], keys[0])
+            with open(f'{tmpdir}/0.nii', 'ab') as f:
+                f.write(b'\x00')
+            self.assertNotEqual(cache.get_keys(filepaths, CONFIG_DICT)[0], keys[0])
+            self.assertIsNone(cache.get_keys(filepaths + [[f'{tmpdir}/missing.nii']], CONFIG_DICT))
+
+    def test_put_and_evict(self):
+        with TemporaryDirectory() as tmpdir:
+            rng = np.random.default_rng(0)
+            images = [Image.fromarray(rng.integers(0, 256, (32, 32, 3), dtype=np.uint8)) for _ in range(5)]
+            cache = TileCache(tmpdir)
+            cache.put('0', images[0])
+            nbytes = os.path.getsize(f'{tmpdir}/0.png')
+            cache.max_bytes = int(3.5 * nbytes)
+            for i, image in enumerate(images[1:3], 1):
+                cache.put(str(i), image)
+                os.utime(f'{tmpdir}/{i}.png', (i, i))
+            os.utime(f'{tmpdir}/0.png', (0, 0))
+            self.assertTrue(np.array_equal(np.asarray(cache.get('0')), np.asarray(images[0])))
+            cache.put('3', images[3])
+            self.assertEqual(sorted([fp[:-4] for fp in os.listdir(tmpdir)]), ['0', '3'])
+            self.assertIsNone(cache.get('1'))
+            self.assertLessEqual(cache.nbytes, .8 * cache.max_bytes)
+            cache.clear()
+            self.assertEqual(os.listdir(tmpdir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()